@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ActivityLog
+from .models import ActivityLog, ActivityRetentionPolicy
 
 @admin.register(ActivityLog)
 class ActivityLogAdmin(admin.ModelAdmin):
@@ -21,3 +21,8 @@ class ActivityLogAdmin(admin.ModelAdmin):
         # Only superusers can delete activity logs
         return request.user.is_superuser
 
+
+@admin.register(ActivityRetentionPolicy)
+class ActivityRetentionPolicyAdmin(admin.ModelAdmin):
+    list_display = ['project', 'retention_days', 'updated_at']
+    search_fields = ['project__name']
@@ -7,3 +7,6 @@ class AnalyticsConfig(AppConfig):
 
     def ready(self):
         import analytics.signals
+        from django.db.backends.signals import connection_created
+        from .slow_queries import install_slow_query_wrapper
+        connection_created.connect(install_slow_query_wrapper, dispatch_uid="analytics_slow_queries")
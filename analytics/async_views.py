@@ -0,0 +1,92 @@
+"""
+Async (ASGI) version of the activity feed.
+Response body matches ActivityLogViewSet.recent.
+"""
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+
+from taskflow.async_utils import async_api_view, json_response
+from . import live
+from .serializers import ActivityLogSerializer
+from .utils import get_activity_queryset
+
+
+@async_api_view
+async def recent_activities(request):
+    """Get recent activities (last 24 hours)"""
+    yesterday = timezone.now() - timedelta(days=1)
+    activities = get_activity_queryset(request.user, request.GET).filter(created_at__gte=yesterday)
+
+    serializer = ActivityLogSerializer([activity async for activity in activities.aiterator()], many=True)
+    return json_response(serializer.data)
+
+
+def _sse_event(activity):
+    data = json.dumps(activity, cls=DjangoJSONEncoder)
+    return f"id: {activity['id']}\nevent: activity\ndata: {data}\n\n"
+
+
+@async_api_view
+async def live_activities_stream(request):
+    """
+    Server-sent events with the new activities of the user's projects.
+
+    Starts after `since`, the Last-Event-ID of a reconnecting client, or
+    otherwise at the latest activity. Sends a comment every
+    ACTIVITY_LIVE_HEARTBEAT_SECONDS so proxies keep the connection open, and
+    ends after ACTIVITY_LIVE_STREAM_SECONDS; clients reconnect with the last
+    event id. Accepts the same filters as the activity feed.
+    """
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would have to buffer the whole stream
+        return json_response(
+            {"detail": "Streaming needs an ASGI server, use activities/live/poll/ instead."},
+            status.HTTP_501_NOT_IMPLEMENTED,
+        )
+
+    user, params = request.user, request.GET
+    since = live.parse_since(request.headers.get("Last-Event-ID") or params.get("since"))
+    project_ids = await sync_to_async(live.subscribed_project_ids)(user)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ACTIVITY_LIVE_STREAM_SECONDS
+        # Closed when the client disconnects and the stream is cancelled
+        with live.get_broker().subscribe(project_ids) as subscription:
+            last_id = since
+            if last_id is None:
+                last_id = await sync_to_async(live.latest_activity_id)(user, params)
+            yield "retry: 3000\n\n"
+
+            while True:
+                activities = [activity async for activity in live.activities_after(user, params, last_id)]
+                if activities:
+                    last_id = activities[-1].id
+                    for activity in ActivityLogSerializer(activities, many=True).data:
+                        yield _sse_event(activity)
+                    if len(activities) == live.BATCH_SIZE:
+                        continue
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                await sync_to_async(live.release_connections)()
+                # Woken or not, check the database again: a message may have
+                # been lost between nodes
+                if not await subscription.wait_async(min(settings.ACTIVITY_LIVE_HEARTBEAT_SECONDS, remaining)):
+                    yield ": keepalive\n\n"
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Tell nginx not to buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
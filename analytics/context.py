@@ -0,0 +1,31 @@
+"""
+Request-scoped actor context for activity logging.
+The middleware binds the current request to a ContextVar; the acting user is
+read from it lazily, after DRF has authenticated the request and copied the
+user onto the underlying HttpRequest. ContextVars are isolated per thread and
+per asyncio task, so this works under both WSGI and ASGI.
+"""
+from contextvars import ContextVar
+
+_current_request = ContextVar("activity_request", default=None)
+
+
+def bind_request(request):
+    """Bind a request to the current context, returns a token for `unbind_request`"""
+    return _current_request.set(request)
+
+
+def unbind_request(token):
+    _current_request.reset(token)
+
+
+def get_current_user():
+    """Authenticated user of the current request, or None outside a request"""
+    request = _current_request.get()
+    if request is None:
+        return None
+
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user
@@ -0,0 +1,241 @@
+"""
+Live activity updates.
+
+Dashboards used to poll the activity feed every few seconds. They can now keep
+one request open instead: an SSE stream under ASGI
+(/api/analytics/activities/live/stream/) or a long-poll under WSGI
+(/api/analytics/activities/live/poll/). Both wait on a broker subscription
+for the user's projects and only query the database once something was
+published for one of them.
+
+Messages carry nothing but the project id. Subscribers always read the new
+rows through get_activity_queryset, so what a user sees is decided by the
+database and not by what was published.
+
+LocalBroker fans out within one process. With several processes or nodes,
+set ACTIVITY_LIVE_BROKER to RedisBroker: every process publishes to a Redis
+channel and one listener thread per process hands the messages to its local
+subscribers. While Redis is unreachable messages only reach the publishing
+process; streams still re-check the database every heartbeat.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+from . import metrics
+from .utils import get_activity_queryset
+
+logger = logging.getLogger("analytics")
+
+try:
+    import redis
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover
+    redis = None
+    RedisError = OSError
+
+# Subscription key for users who see every project
+ALL_PROJECTS = None
+
+# Most activities sent in one response or SSE burst
+BATCH_SIZE = 100
+
+
+class Subscription:
+    """
+    Wakes up one waiting request, sync or async, when a project it follows
+    gets a new activity. Use it as a context manager so it is closed.
+    """
+
+    def __init__(self, broker, project_ids):
+        self.broker = broker
+        self.project_ids = project_ids
+        self._event = threading.Event()
+        self._async_waiter = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.broker.unsubscribe(self)
+
+    def notify(self):
+        # Called from whichever thread published
+        self._event.set()
+        waiter = self._async_waiter
+        if waiter is not None:
+            loop, event = waiter
+            loop.call_soon_threadsafe(event.set)
+
+    def wait(self, timeout):
+        """Block until notified or `timeout` seconds passed, returns whether notified"""
+        notified = self._event.wait(timeout)
+        # Cleared before the caller reads, so later messages are not lost
+        self._event.clear()
+        return notified
+
+    async def wait_async(self, timeout):
+        event = asyncio.Event()
+        self._async_waiter = (asyncio.get_running_loop(), event)
+        try:
+            # A message may have come in before the waiter was registered
+            if not self._event.is_set():
+                await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._async_waiter = None
+        self._event.clear()
+        return True
+
+
+class LocalBroker:
+    """In-process pub/sub keyed by project id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, project_ids=ALL_PROJECTS):
+        """Subscribe to the given project ids, or to every project"""
+        subscription = Subscription(self, None if project_ids is ALL_PROJECTS else frozenset(project_ids))
+        keys = [ALL_PROJECTS] if subscription.project_ids is None else subscription.project_ids
+        with self._lock:
+            for key in keys:
+                self._subscriptions[key].add(subscription)
+        metrics.ACTIVITY_LIVE_LISTENERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        keys = [ALL_PROJECTS] if subscription.project_ids is None else subscription.project_ids
+        with self._lock:
+            for key in keys:
+                subscribers = self._subscriptions.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[key]
+        metrics.ACTIVITY_LIVE_LISTENERS.inc(-1)
+
+    def publish(self, project_id):
+        self.deliver(project_id)
+
+    def deliver(self, project_id):
+        """Notify this process' subscribers of `project_id`"""
+        with self._lock:
+            subscribers = self._subscriptions.get(project_id, set()) | self._subscriptions.get(ALL_PROJECTS, set())
+        for subscription in subscribers:
+            subscription.notify()
+
+
+class RedisBroker(LocalBroker):
+    """LocalBroker whose messages go through a Redis pub/sub channel"""
+
+    def __init__(self, url=None, channel=None):
+        super().__init__()
+        if redis is None:  # pragma: no cover
+            raise RuntimeError("RedisBroker needs the redis package")
+        self.url = url or settings.ACTIVITY_LIVE_REDIS_URL
+        self.channel = channel or settings.ACTIVITY_LIVE_REDIS_CHANNEL
+        # Publishing happens after commit on the request thread, keep it short
+        self._client = redis.Redis.from_url(self.url, socket_connect_timeout=0.25, socket_timeout=0.5)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, project_ids=ALL_PROJECTS):
+        self._start_listener()
+        return super().subscribe(project_ids)
+
+    def publish(self, project_id):
+        try:
+            self._client.publish(self.channel, "" if project_id is None else str(project_id))
+        except RedisError as exc:
+            logger.warning("Live activity publish failed, delivering locally only: %s", exc)
+            self.deliver(project_id)
+
+    def _start_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="activity-live-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        backoff = 1.0
+        while True:
+            try:
+                client = redis.Redis.from_url(self.url, socket_connect_timeout=0.25, health_check_interval=30)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = 1.0
+                for message in pubsub.listen():
+                    data = message["data"].decode()
+                    self.deliver(int(data) if data else None)
+            except (RedisError, ValueError) as exc:
+                logger.warning("Live activity listener lost Redis, retrying in %.0fs: %s", backoff, exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.ACTIVITY_LIVE_BROKER)()
+
+
+def publish_activity(activity):
+    """Publish a new activity once its transaction has committed"""
+    project_id = activity.project_id
+    transaction.on_commit(lambda: get_broker().publish(project_id))
+
+
+def subscribed_project_ids(user):
+    """What `user` subscribes to: the projects they belong to, or ALL_PROJECTS"""
+    if user.is_superadmin():
+        return ALL_PROJECTS
+    return set(user.project_memberships.values_list("project_id", flat=True))
+
+
+def activities_after(user, params, after_id):
+    """The next activities visible to `user` with an id above `after_id`, oldest first"""
+    return get_activity_queryset(user, params).filter(id__gt=after_id).order_by("id")[:BATCH_SIZE]
+
+
+def parse_since(value):
+    """An activity id cursor from a query param or Last-Event-ID, None if absent"""
+    if value in (None, ""):
+        return None
+    try:
+        since = int(value)
+    except ValueError:
+        raise ValidationError({"since": "Must be an activity id."})
+    if since < 0:
+        raise ValidationError({"since": "Must be an activity id."})
+    return since
+
+
+def latest_activity_id(user, params):
+    return get_activity_queryset(user, params).order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def release_connections():
+    """
+    Give back this thread's database connections before waiting, so an idle
+    listener does not hold a connection or a pool slot. Not inside a
+    transaction, where closing would break it.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from analytics.metrics import registry
+from analytics.retention import archive_activity_logs
+
+
+class Command(BaseCommand):
+    help = "Move activity logs older than their retention window to gzipped NDJSON files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", help="Defaults to ACTIVITY_LOG_ARCHIVE_DIR")
+        parser.add_argument("--batch-size", type=int, help="Defaults to ACTIVITY_LOG_ARCHIVE_BATCH_SIZE")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be archived")
+
+    def handle(self, *args, **options):
+        result = archive_activity_logs(
+            output_dir=options["output_dir"],
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(f"{result['archived']} activity logs would be archived")
+            return
+
+        # Short-lived process, hand its archive counters to the shared metrics directory
+        registry.write_process_file(force=True)
+        for path in result["files"]:
+            self.stdout.write(f"Wrote {path}")
+        self.stdout.write(self.style.SUCCESS(f"Archived {result['archived']} activity logs"))
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from taskflow.benchmarking import compare_with_baseline, load_baseline, run_benchmarks, write_baseline
+from taskflow.seeding import SCALES, DataSeeder
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+# Process-local cache and inline fan-out, so every query is counted on this
+# thread. Cached endpoints are measured computing their results; warm hits
+# would record no queries and hide regressions behind the cache.
+BENCHMARK_SETTINGS = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "FANOUT_MAX_WORKERS": 1,
+    "ENDPOINT_CACHE_ENABLED": False,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot API endpoints against a freshly seeded test database and "
+        "compare latency, query counts and rows fetched with the committed baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, help="Defaults to the baseline's scale")
+        parser.add_argument("--seed", type=int, help="Defaults to the baseline's seed")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--endpoint", action="append", dest="endpoints", help="Only run this endpoint, repeatable")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+        parser.add_argument("--latency-tolerance", type=float, default=1.0,
+                            help="Allowed p95 growth as a fraction, 1.0 allows doubling")
+        parser.add_argument("--latency-floor", type=float, default=10.0,
+                            help="p95 growth in ms that is always allowed, for endpoints too fast to time reliably")
+        parser.add_argument("--rows-tolerance", type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options["baseline"])
+        baseline = load_baseline(baseline_path) if baseline_path.exists() else {}
+        scale = options["scale"] or baseline.get("scale", "small")
+        seed = options["seed"] if options["seed"] is not None else baseline.get("seed", 0)
+
+        if baseline and not options["update_baseline"] and (scale, seed) != (baseline.get("scale"), baseline.get("seed")):
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded at scale={baseline.get('scale')} seed={baseline.get('seed')}, "
+                "query and row counts are not comparable"
+            ))
+            baseline = {}
+
+        results = self.run(scale, seed, options)
+        self.print_results(results)
+
+        if options["update_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            write_baseline(baseline_path, results, scale=scale, seed=seed, iterations=options["iterations"])
+            self.stdout.write(self.style.SUCCESS(f"Wrote {baseline_path}"))
+            return
+
+        if not baseline:
+            self.stdout.write(self.style.WARNING("No baseline to compare with, run with --update-baseline"))
+            return
+
+        regressions = compare_with_baseline(
+            results, baseline,
+            latency_tolerance=options["latency_tolerance"],
+            latency_floor_ms=options["latency_floor"],
+            rows_tolerance=options["rows_tolerance"],
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f"{len(regressions)} benchmark regressions")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def run(self, scale, seed, options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**BENCHMARK_SETTINGS):
+                self.stdout.write(f"Seeding a {scale} data set (seed {seed})")
+                DataSeeder(**SCALES[scale], seed=seed).run()
+                return run_benchmarks(
+                    iterations=options["iterations"],
+                    warmup=options["warmup"],
+                    only=options["endpoints"],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def print_results(self, results):
+        width = max((len(key) for key in results), default=0)
+        self.stdout.write(f"{'endpoint'.ljust(width)}  {'p50 ms':>8}  {'p95 ms':>8}  {'queries':>7}  {'rows':>7}")
+        for key, metrics in results.items():
+            self.stdout.write(
+                f"{key.ljust(width)}  {metrics['p50_ms']:>8}  {metrics['p95_ms']:>8}  "
+                f"{metrics['queries']:>7}  {metrics['rows']:>7}"
+            )
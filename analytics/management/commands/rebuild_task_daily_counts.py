@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics.task_counts import rebuild_task_daily_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the per-day task counters behind the weekly chart from the task table, "
+        "after bulk imports or changes to TASK_CHART_TIMEZONES"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Only recount the last DAYS days, defaults to all")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["days"]:
+            since = timezone.localdate() - timedelta(days=options["days"])
+
+        rows = rebuild_task_daily_counts(since)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} task daily counters"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from taskflow.seeding import DEFAULT_PASSWORD, SCALES, DataSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic data set of users, projects, memberships, "
+        "tasks, comments and activity logs for load and performance testing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="small",
+                            help="small: 1k tasks, medium: 100k tasks, large: 1M tasks")
+        parser.add_argument("--users", type=int, help="Overrides the scale's user count")
+        parser.add_argument("--projects", type=int, help="Overrides the scale's project count")
+        parser.add_argument("--tasks", type=int, help="Overrides the scale's task count")
+        parser.add_argument("--comments-per-task", type=float, default=0.5)
+        parser.add_argument("--activities-per-task", type=float, default=2.0)
+        parser.add_argument("--min-members", type=int, default=3, help="Members per project besides the owner")
+        parser.add_argument("--max-members", type=int, default=15)
+        parser.add_argument("--days", type=int, default=365, help="How far back timestamps are spread")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Shared by every generated user")
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name] if options[name] is not None else default
+            for name, default in SCALES[options["scale"]].items()
+        }
+        if counts["users"] < 1:
+            raise CommandError("At least one user is needed")
+        if options["min_members"] > options["max_members"]:
+            raise CommandError("--min-members cannot be larger than --max-members")
+
+        seeder = DataSeeder(
+            **counts,
+            comments_per_task=options["comments_per_task"],
+            activities_per_task=options["activities_per_task"],
+            members_per_project=(options["min_members"], options["max_members"]),
+            days=options["days"],
+            seed=options["seed"],
+            chunk_size=options["chunk_size"],
+            password=options["password"],
+            log=self.stdout.write,
+        )
+        totals = seeder.run()
+        summary = ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}"))
@@ -0,0 +1,268 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms live in memory in each process. When
+METRICS_MULTIPROC_DIR is set, every process periodically writes its values
+to `<dir>/<pid>.json` (and once more at exit), and the /metrics endpoint sums
+the files of all processes, so any gunicorn worker can answer a scrape for
+the whole server. Files of exited workers are kept, the way counters survive
+a worker restart; clear the directory when deploying. Gauges describe the
+current state, so only the files of running processes count for them.
+
+Metric definitions are at the bottom of this module. Instrumented code only
+calls `inc` / `set` / `observe`, which are cheap and thread-safe.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return json.dumps([labels[name] for name in labelnames])
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, json.loads(key))) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(total, values):
+        for key, value in values.items():
+            total[key] = total.get(key, 0) + value
+        return total
+
+    def render(self, values):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    """
+    A value that can go down. Summed over running processes, so per process
+    flags (0/1) read as "how many processes are in this state".
+    """
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            # Non-cumulative per bucket, summed up when rendering
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {**state, "buckets": list(state["buckets"])} for key, state in self._values.items()}
+
+    @staticmethod
+    def merge(total, values):
+        for key, state in values.items():
+            current = total.setdefault(key, {"buckets": [0] * len(state["buckets"]), "sum": 0.0, "count": 0})
+            current["buckets"] = [a + b for a, b in zip(current["buckets"], state["buckets"])]
+            current["sum"] += state["sum"]
+            current["count"] += state["count"]
+        return total
+
+    def render(self, values):
+        lines = []
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+def _is_running(pid):
+    """Whether a process with this pid exists on this host"""
+    if os.name != "posix":
+        # os.kill would terminate it on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._last_write = 0.0
+        self._write_lock = threading.Lock()
+        self._atexit_registered = False
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _directory(self):
+        directory = settings.METRICS_MULTIPROC_DIR
+        return Path(directory) if directory else None
+
+    def write_process_file(self, force=False):
+        """Write this process's values for aggregation, at most every METRICS_WRITE_INTERVAL seconds"""
+        directory = self._directory()
+        if directory is None:
+            return
+        if not force and time.monotonic() - self._last_write < settings.METRICS_WRITE_INTERVAL:
+            return
+
+        with self._write_lock:
+            if not self._atexit_registered:
+                atexit.register(self.write_process_file, force=True)
+                self._atexit_registered = True
+
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{os.getpid()}.json"
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+            # Readers never see a partially written file
+            os.replace(tmp_path, path)
+            self._last_write = time.monotonic()
+
+    def collect(self):
+        """Values summed over every process sharing the directory, or this process's alone"""
+        directory = self._directory()
+        if directory is None:
+            return self.snapshot()
+
+        self.write_process_file(force=True)
+        totals = {}
+        for path in directory.glob("*.json"):
+            try:
+                values = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            running = not path.stem.isdigit() or _is_running(int(path.stem))
+            for name, metric_values in values.items():
+                metric = self._metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not running):
+                    continue
+                totals[name] = metric.merge(totals.get(name, {}), metric_values)
+        return totals
+
+    def render(self):
+        values = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(values.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "taskflow_request_duration_seconds",
+    "Request latency by URL name",
+    ["route", "method"],
+)
+DB_QUERIES = registry.counter(
+    "taskflow_db_queries_total",
+    "SQL queries executed by requests, by URL name",
+    ["route"],
+)
+CACHE_REQUESTS = registry.counter(
+    "taskflow_cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+CACHE_FALLBACKS = registry.counter(
+    "taskflow_cache_fallbacks_total",
+    "Shared cache calls served by the local-memory fallback, by operation",
+    ["operation"],
+)
+CACHE_CIRCUIT_OPEN = registry.gauge(
+    "taskflow_cache_circuit_open",
+    "Processes whose circuit breaker to the shared cache is open",
+)
+CACHE_CIRCUIT_OPENED = registry.counter(
+    "taskflow_cache_circuit_opened_total",
+    "Times the circuit breaker to the shared cache opened",
+)
+ACTIVITY_LIVE_LISTENERS = registry.gauge(
+    "taskflow_activity_live_listeners",
+    "Open live activity streams and long-polls",
+)
+ARCHIVE_BATCHES = registry.counter(
+    "taskflow_activity_archive_batches_total",
+    "Activity log batches written to the archive and deleted",
+)
+ARCHIVED_ROWS = registry.counter(
+    "taskflow_activity_archived_rows_total",
+    "Activity log rows written to the archive and deleted",
+)
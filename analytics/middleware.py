@@ -1,99 +1,180 @@
 # analytics/middleware.py
-from threading import local
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.authentication import TokenAuthentication
-from django.contrib.auth.models import AnonymousUser
+import json
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from .context import bind_request, unbind_request
+from .profiling import end_profile, install_serializer_timing, run_cprofile, start_profile
 
 import logging
 
 logger = logging.getLogger("analytics")
 
 
+class ActivityLogMiddleware:
+    """
+    Bind the request to the actor context used by the activity signal handlers.
 
-_thread_locals = local()
+    No authentication happens here: DRF authenticates the request once inside
+    the view and sets `request.user`, which `get_current_user` reads lazily
+    when a signal fires.
+    """
+    sync_capable = True
+    async_capable = True
 
-def get_current_user():
-    """Get current user from thread local"""
-    return getattr(_thread_locals, 'user', None)
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = bind_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            unbind_request(token)
+
+    async def __acall__(self, request):
+        token = bind_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            unbind_request(token)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request profiling, enabled with PROFILING_ENABLED.
+
+    Records wall time, SQL time and query count, identical queries run more
+    than once, serializer time and response size. They are sent back in a
+    Server-Timing header and logged as one JSON line to the `tasks` logger for
+    task routes and the `analytics` logger otherwise. A PROFILING_CPROFILE_RATE
+    fraction of requests also runs under cProfile and logs the top functions.
+
+    Sync only; Django adapts it for async views, which then run in a thread.
+    """
 
-class ActivityLogMiddleware:
-    """Middleware to store current user in thread local for signal handlers"""
-    
     def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
         self.get_response = get_response
-        # Initialize authenticators
-        self.jwt_auth = JWTAuthentication()
-        # If using Token auth instead, use:
-        # self.token_auth = TokenAuthentication()
-    
+        install_serializer_timing()
+
     def __call__(self, request):
-        # Try to authenticate user from JWT/Token
-        user = self._authenticate_user(request)
-        
-        # Store user in thread local
-        _thread_locals.user = user
-        
-        # logger.info(f"Authenticated user {getattr(user, 'id', None)} {getattr(user, 'username', None)}")
-
-        # Also attach to signal handlers
-        from .signals import task_post_save, task_pre_delete, comment_post_save
-        task_post_save.thread_local = _thread_locals
-        task_pre_delete.thread_local = _thread_locals
-        comment_post_save.thread_local = _thread_locals
-        
-        response = self.get_response(request)
-        
-        # Clean up
-        if hasattr(_thread_locals, 'user'):
-            del _thread_locals.user
-        
-        return response
-    
-    def _authenticate_user(self, request):
-        """Authenticate user from JWT token or fallback to request.user"""
-        
-        # Skip authentication for non-API requests (like admin)
-        if not request.path.startswith('/api/'):
-            return getattr(request, 'user', None)
-        
-        # Try JWT authentication
+        profile, token = start_profile()
+        stats = None
         try:
-            auth_result = self.jwt_auth.authenticate(request)
-            if auth_result is not None:
-                user, token = auth_result
-                return user
-        except Exception as e:
-            logger.error(f"JWT auth failed: {e}")
-            pass
-        
-        # If using Token authentication, uncomment this:
-        # try:
-        #     auth_result = self.token_auth.authenticate(request)
-        #     if auth_result is not None:
-        #         user, token = auth_result
-        #         return user
-        # except Exception:
-        #     pass
-        
-        # Fallback to request.user (for session auth, admin)
-        return getattr(request, 'user', None)
-
-
-# Alternative: Simpler version that just gets user from request
-# Use this if you don't want to duplicate authentication logic
-class SimpleActivityLogMiddleware:
-    """Simpler middleware - just passes through request.user"""
-    
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+
+                if random.random() < settings.PROFILING_CPROFILE_RATE:
+                    response, stats = run_cprofile(
+                        self.get_response, request, top=settings.PROFILING_CPROFILE_TOP,
+                    )
+                else:
+                    response = self.get_response(request)
+        finally:
+            end_profile(token)
+        profile.finish()
+
+        size = None if response.streaming else len(response.content)
+        response["Server-Timing"] = self.server_timing(profile)
+        self.log(request, response, profile, size, stats)
+        return response
+
+    def server_timing(self, profile):
+        return ", ".join([
+            f"total;dur={profile.total_time * 1000:.1f}",
+            f'db;dur={profile.db_time * 1000:.1f};desc="{profile.query_count} queries"',
+            f"serialize;dur={profile.serialize_time * 1000:.1f}",
+        ])
+
+    def log(self, request, response, profile, size, stats):
+        match = request.resolver_match
+        duplicates = profile.duplicates()
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": match.route if match else None,
+            "status": response.status_code,
+            "total_ms": round(profile.total_time * 1000, 2),
+            "db_ms": round(profile.db_time * 1000, 2),
+            "queries": profile.query_count,
+            "duplicate_queries": sum(count - 1 for _, count in duplicates),
+            "serialize_ms": round(profile.serialize_time * 1000, 2),
+            "response_bytes": size,
+        }
+
+        view_module = match.func.__module__ if match else ""
+        profile_logger = logging.getLogger("tasks" if view_module.startswith("tasks.") else "analytics")
+        profile_logger.info("request profile %s", json.dumps(record))
+
+        if duplicates:
+            profile_logger.warning("duplicate queries on %s %s", request.path, json.dumps(duplicates[:5]))
+        if stats:
+            profile_logger.debug("cProfile for %s\n%s", request.path, stats)
+
+
+class MetricsMiddleware:
+    """
+    Feed the metrics registry: latency per URL name and method, and the SQL
+    queries each URL name runs. Queries of async views run in worker threads
+    on other connections and are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
         self.get_response = get_response
-    
-    def process_view(self, request, view_func, view_args, view_kwargs):
-        """Called after URL is resolved but before view is called"""
-        # At this point, authentication hasn't happened yet
-        # So we can't get the authenticated user here either
-        return None
-    
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
     def __call__(self, request):
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        self.record(request, time.perf_counter() - start, counter.count)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, time.perf_counter() - start, 0)
+        return response
+
+    def record(self, request, duration, query_count):
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else "unmatched"
+        metrics.REQUEST_LATENCY.observe(duration, route=route, method=request.method)
+        if query_count:
+            metrics.DB_QUERIES.inc(query_count, route=route)
+        metrics.registry.write_process_file()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
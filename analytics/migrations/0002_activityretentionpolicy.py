@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('projects', '0005_alter_project_options_alter_projectmember_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRetentionPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('retention_days', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='activity_retention', to='projects.project')),
+            ],
+            options={
+                'verbose_name_plural': 'activity retention policies',
+                'ordering': ['project'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_activityretentionpolicy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timezone', models.CharField(max_length=64)),
+                ('day', models.DateField()),
+                ('user_id', models.BigIntegerField(default=0)),
+                ('project_id', models.BigIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['timezone', 'day'], name='analytics_t_timezon_a85c3c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('timezone', 'user_id', 'day', 'project_id'), name='unique_task_daily_count')],
+            },
+        ),
+    ]
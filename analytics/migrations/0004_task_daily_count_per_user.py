@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:51
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def merge_projects(apps, schema_editor):
+    # One counter per timezone, user and day before the constraint comes back
+    TaskDailyCount = apps.get_model('analytics', 'TaskDailyCount')
+    totals = list(
+        TaskDailyCount.objects.values('timezone', 'user_id', 'day')
+        .annotate(total=Sum('count'))
+        .order_by()
+    )
+    TaskDailyCount.objects.all().delete()
+    TaskDailyCount.objects.bulk_create(
+        [
+            TaskDailyCount(timezone=row['timezone'], user_id=row['user_id'], day=row['day'], count=row['total'])
+            for row in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_task_daily_count'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='taskdailycount',
+            name='unique_task_daily_count',
+        ),
+        migrations.RunPython(merge_projects, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='taskdailycount',
+            name='project_id',
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailycount',
+            constraint=models.UniqueConstraint(fields=('timezone', 'user_id', 'day'), name='unique_task_daily_count'),
+        ),
+    ]
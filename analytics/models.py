@@ -37,4 +37,45 @@ class ActivityLog(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.action} - {self.created_at}"
\ No newline at end of file
+        return f"{self.user.username} - {self.action} - {self.created_at}"
+
+
+class ActivityRetentionPolicy(models.Model):
+    """Per-project override of how long activity logs are kept before archiving"""
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='activity_retention')
+    retention_days = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['project']
+        verbose_name_plural = 'activity retention policies'
+
+    def __str__(self):
+        return f"{self.project.name} - {self.retention_days} days"
+
+class TaskDailyCount(models.Model):
+    """
+    Tasks created per day and user, for the weekly chart.
+    Days are local days in `timezone`, one of TASK_CHART_TIMEZONES. A plain
+    id with 0 for none, so the unique constraint also covers unassigned
+    tasks. Kept up to date by analytics.signals, rebuilt by
+    `manage.py rebuild_task_daily_counts`.
+    """
+    timezone = models.CharField(max_length=64)
+    day = models.DateField()
+    user_id = models.BigIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index of the per-user chart
+            models.UniqueConstraint(
+                fields=['timezone', 'user_id', 'day'], name='unique_task_daily_count',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['timezone', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} ({self.timezone}) - {self.count}"
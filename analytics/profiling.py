@@ -0,0 +1,111 @@
+"""
+Per-request profiling data, collected by analytics.middleware.ProfilingMiddleware.
+
+A RequestProfile is bound to a ContextVar for the duration of a request. It
+is installed as a connection `execute_wrapper` to time every query, and the
+`.data` property of DRF serializers reports into it, so time spent turning
+objects into primitives is measured separately. Queries run on other threads
+(e.g. by taskflow.fanout) use other connections and are not recorded.
+"""
+import cProfile
+import io
+import pstats
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from rest_framework.serializers import BaseSerializer
+
+_current_profile = ContextVar("request_profile", default=None)
+
+# Longest SQL text kept in duplicate query reports
+MAX_SQL_LENGTH = 300
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.db_time = 0.0
+        self.query_count = 0
+        self.serialize_time = 0.0
+        self._serializer_depth = 0
+        self._query_keys = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            # executemany parameter lists can be huge, group those by SQL only
+            self._query_keys[sql if many else (sql, repr(params))] += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total_time(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def duplicates(self):
+        """[(sql, times executed)] for identical queries run more than once, most repeated first"""
+        return [
+            ((key if isinstance(key, str) else key[0])[:MAX_SQL_LENGTH], count)
+            for key, count in self._query_keys.most_common()
+            if count > 1
+        ]
+
+
+def start_profile():
+    profile = RequestProfile()
+    return profile, _current_profile.set(profile)
+
+
+def end_profile(token):
+    _current_profile.reset(token)
+
+
+_original_data = BaseSerializer.data
+
+
+def _profiled_data(self):
+    profile = _current_profile.get()
+    if profile is None:
+        return _original_data.fget(self)
+
+    # Only the outermost serializer is timed, nested ones are part of it
+    profile._serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_data.fget(self)
+    finally:
+        profile._serializer_depth -= 1
+        if profile._serializer_depth == 0:
+            profile.serialize_time += time.perf_counter() - start
+
+
+def install_serializer_timing():
+    """Make serializer `.data` report into the current profile; idempotent"""
+    BaseSerializer.data = property(_profiled_data)
+
+
+def run_cprofile(func, *args, top=20):
+    """
+    Call func under cProfile. Returns (result, stats text), or (result, None)
+    when another profiler is already active in this process.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return func(*args), None
+    try:
+        result = func(*args)
+    finally:
+        profiler.disable()
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+    return result, output.getvalue()
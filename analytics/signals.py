@@ -2,10 +2,15 @@
 Automatic activity logging using Django signals.
 This approach automatically logs certain actions without manual intervention.
 """
-from django.db.models.signals import post_save, pre_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from tasks.models import Task, TaskComment
+from tasks.models import Task, TaskComment, TaskTombstone
 from projects.models import Project, ProjectMember
+from taskflow.endpoint_cache import bump_versions
+from .context import get_current_user
+from .live import publish_activity
+from .models import ActivityLog
+from .task_counts import count_task, counter_key
 from .utils import (
     log_task_creation, log_status_change, log_comment,
     log_task_deletion, log_project_creation
@@ -18,7 +23,7 @@ _task_original_values = {}
 @receiver(pre_save, sender=Task)
 def task_pre_save(sender, instance, **kwargs):
     """Store original task values before save"""
-    if instance.pk:
+    if instance.pk and get_current_user() is not None:
         try:
             original = Task.objects.get(pk=instance.pk)
             _task_original_values[instance.pk] = {
@@ -34,17 +39,15 @@ def task_pre_save(sender, instance, **kwargs):
 @receiver(post_save, sender=Task)
 def task_post_save(sender, instance, created, **kwargs):
     """Log task creation and updates automatically"""
-    # Skip if no user in thread local (for bulk operations)
-    from threading import local
-    thread_local = getattr(task_post_save, 'thread_local', None)
-    if not thread_local or not hasattr(thread_local, 'user'):
+    # Skip if there is no acting user (management commands, bulk operations)
+    user = get_current_user()
+    if user is None:
+        _task_original_values.pop(instance.pk, None)
         return
 
-    user = thread_local.user
-    
     if created:
         # Log creation
-        log_ = log_task_creation(user, instance)
+        log_task_creation(user, instance)
     else:
         # Check for status change
         original = _task_original_values.get(instance.pk, {})
@@ -58,22 +61,70 @@ def task_post_save(sender, instance, created, **kwargs):
 
 @receiver(pre_delete, sender=Task)
 def task_pre_delete(sender, instance, **kwargs):
-    """Log task deletion before it's deleted"""
-    from threading import local
-    thread_local = getattr(task_pre_delete, 'thread_local', None)
-    if thread_local and hasattr(thread_local, 'user'):
-        log_task_deletion(thread_local.user, instance)
+    """Log task deletion before it's deleted, and leave a tombstone for delta sync"""
+    TaskTombstone.objects.create(
+        task_id=instance.pk, user_id=instance.user_id, project_id=instance.project_id,
+    )
+
+    user = get_current_user()
+    if user is not None:
+        log_task_deletion(user, instance)
+
+
+@receiver(post_save, sender=Task)
+def task_reassigned_post_save(sender, instance, created, **kwargs):
+    """Leave a tombstone for the previous assignee's delta sync when a task is reassigned"""
+    if created or instance._loaded is None:
+        return
+    previous_project_id, previous_user_id, _ = instance._loaded
+    if previous_user_id and previous_user_id != instance.user_id:
+        TaskTombstone.objects.create(
+            task_id=instance.pk, user_id=previous_user_id, project_id=previous_project_id,
+        )
+
+
+def _task_versions(*placements):
+    """Cached endpoint versions covering tasks in (project_id, user_id) `placements`"""
+    names = ["all"]
+    for project_id, user_id in filter(None, placements):
+        names += [f"project:{project_id or 0}", f"user:{user_id or 0}"]
+    return names
+
+
+@receiver(post_save, sender=Task)
+def task_counter_post_save(sender, instance, created, **kwargs):
+    """
+    Count new tasks per day, move reassigned ones to their new user, and
+    invalidate the cached analytics of the old and new user and project
+    """
+    previous = instance._loaded and instance._loaded[:2]
+    if created:
+        count_task(instance.created_at, counter_key(instance), 1)
+    elif previous is not None and previous[1] != instance.user_id:
+        count_task(instance.created_at, previous[1] or 0, -1)
+        count_task(instance.created_at, counter_key(instance), 1)
+    bump_versions(*_task_versions((instance.project_id, instance.user_id), previous))
+
+
+@receiver(post_delete, sender=Task)
+def task_counter_post_delete(sender, instance, **kwargs):
+    count_task(instance.created_at, counter_key(instance), -1)
+    bump_versions(*_task_versions((instance.project_id, instance.user_id)))
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def membership_post_change(sender, instance, **kwargs):
+    """Who sees a project's activity statistics changed"""
+    bump_versions(f"project:{instance.project_id}")
 
 
 @receiver(post_save, sender=TaskComment)
 def comment_post_save(sender, instance, created, **kwargs):
     """Log comment creation"""
     if created:
-        from threading import local
-        thread_local = getattr(comment_post_save, 'thread_local', None)
-        if thread_local and hasattr(thread_local, 'user'):
-            # Use comment's user if no thread local user
-            user = getattr(thread_local, 'user', instance.user)
+        user = get_current_user()
+        if user is not None:
             log_comment(user, instance.task, instance)
 
 
@@ -82,3 +133,11 @@ def project_post_save(sender, instance, created, **kwargs):
     """Log project creation"""
     if created:
         log_project_creation(instance.created_by, instance)
+
+
+@receiver(post_save, sender=ActivityLog)
+def activity_post_save(sender, instance, created, **kwargs):
+    """Wake up the live feeds of the activity's project and invalidate its statistics"""
+    if created:
+        publish_activity(instance)
+        bump_versions(f"project:{instance.project_id}")
@@ -0,0 +1,176 @@
+"""
+Slow query log.
+
+A wrapper installed on every new database connection times each query. Queries
+slower than SLOW_QUERY_THRESHOLD_MS are logged to the `analytics` logger with
+a normalized SQL fingerprint, the project frames of the call stack (view,
+serializer, ...) and, once per fingerprint, the database's query plan. The
+per-process `slow_query_log` keeps totals per fingerprint and serves the
+top entries to the staff-only slow query endpoint.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger("analytics")
+
+_PROJECT_DIR = str(Path(settings.BASE_DIR))
+_THIS_FILE = __file__
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+MAX_SQL_LENGTH = 2000
+
+
+def fingerprint(sql):
+    """SQL with literals replaced and IN lists collapsed, so repeats of one query group together"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def get_call_site(depth=None):
+    """Innermost project frames of the current stack, outermost first, as 'path:line in function'"""
+    depth = depth or settings.SLOW_QUERY_STACK_DEPTH
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(_PROJECT_DIR)
+        and frame.filename != _THIS_FILE
+        and "site-packages" not in frame.filename
+    ]
+    return [
+        f"{Path(frame.filename).relative_to(_PROJECT_DIR)}:{frame.lineno} in {frame.name}"
+        for frame in frames[-depth:]
+    ]
+
+
+class SlowQueryLog:
+    """Per-fingerprint totals of slow queries, bounded to roughly SLOW_QUERY_TOP_N entries"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, sql, duration, call_site):
+        """Add one slow execution; returns True if this fingerprint was not seen before"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            is_new = entry is None
+            if is_new:
+                entry = self._entries[key] = {
+                    "fingerprint": key,
+                    "sample_sql": sql[:MAX_SQL_LENGTH],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "call_site": call_site,
+                    "plan": None,
+                }
+                self._prune()
+            if duration * 1000 >= entry["max_ms"]:
+                # The slowest call site is the most useful one to show
+                entry["max_ms"] = duration * 1000
+                entry["call_site"] = call_site
+            entry["count"] += 1
+            entry["total_ms"] += duration * 1000
+            entry["last_seen"] = now
+        return is_new
+
+    def set_plan(self, key, plan):
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]["plan"] = plan
+
+    def _prune(self):
+        limit = settings.SLOW_QUERY_TOP_N
+        if len(self._entries) > limit * 2:
+            keep = sorted(self._entries.values(), key=lambda entry: entry["total_ms"], reverse=True)[:limit]
+            self._entries = {entry["fingerprint"]: entry for entry in keep}
+
+    def top(self, limit=None):
+        limit = limit or settings.SLOW_QUERY_TOP_N
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry["total_ms"], reverse=True)[:limit]
+            return [
+                {**entry, "total_ms": round(entry["total_ms"], 2), "max_ms": round(entry["max_ms"], 2),
+                 "avg_ms": round(entry["total_ms"] / entry["count"], 2)}
+                for entry in entries
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+slow_query_log = SlowQueryLog()
+
+_explaining = threading.local()
+
+
+def explain(connection, sql, params):
+    """The database's plan for a SELECT, or None if it cannot be explained"""
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return None
+
+    _explaining.active = True
+    try:
+        # Savepoint, so a failing EXPLAIN cannot break the caller's transaction
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                return [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+    finally:
+        _explaining.active = False
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if getattr(_explaining, "active", False):
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is not None and duration * 1000 >= threshold:
+        connection = context["connection"]
+        key = fingerprint(sql)
+        call_site = get_call_site()
+        is_new = slow_query_log.record(key, sql, duration, call_site)
+
+        plan = None
+        if is_new and settings.SLOW_QUERY_EXPLAIN and not many:
+            plan = explain(connection, sql, params)
+            slow_query_log.set_plan(key, plan)
+
+        logger.warning("slow query %s", json.dumps({
+            "duration_ms": round(duration * 1000, 2),
+            "database": connection.alias,
+            "fingerprint": key,
+            "call_site": call_site,
+            "plan": plan,
+        }))
+    return result
+
+
+def install_slow_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if settings.SLOW_QUERY_THRESHOLD_MS is not None and slow_query_wrapper not in connection.execute_wrappers:
+        # First in the list: connection.execute_wrapper() blocks pop the last
+        # entry on exit, and the connection may be created inside one of them
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
@@ -0,0 +1,107 @@
+"""
+Per-day task counters behind the weekly chart.
+
+Every task is counted in TaskDailyCount once per TASK_CHART_TIMEZONES entry,
+under its local creation day there and its user. Signals keep the counters
+in step with Task saves and deletes inside the same transaction, so the
+chart reads at most 7 days x users rows from an index range instead of
+grouping the task table. Projects are not part of the key, so deleting one
+(tasks are SET_NULL in SQL) leaves the counters valid.
+
+bulk_create and QuerySet.update skip model signals. After those, or to
+start counting on an existing database, run
+`manage.py rebuild_task_daily_counts`.
+"""
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from tasks.models import Task
+from .models import TaskDailyCount
+
+CHART_DAYS = 7
+
+
+def counter_key(task):
+    """What a task is counted under besides the day: its user_id, 0 for none"""
+    return task.user_id or 0
+
+
+def _add(timezone_name, day, user_id, delta):
+    key = {"timezone": timezone_name, "day": day, "user_id": user_id}
+    if TaskDailyCount.objects.filter(**key).update(count=F("count") + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            TaskDailyCount.objects.create(count=delta, **key)
+    except IntegrityError:
+        # Created by a concurrent transaction in the meantime
+        TaskDailyCount.objects.filter(**key).update(count=F("count") + delta)
+
+
+def count_task(created_at, key, delta):
+    """Add `delta` to the counters of a task created at `created_at` under `key`"""
+    for timezone_name in settings.TASK_CHART_TIMEZONES:
+        day = timezone.localdate(created_at, ZoneInfo(timezone_name))
+        _add(timezone_name, day, key, delta)
+
+
+def rebuild_task_daily_counts(since=None):
+    """
+    Recount from the task table, for the days from `since` (a date) on or for
+    all of them. Returns the number of counter rows written.
+    """
+    rows = []
+    with transaction.atomic():
+        counters = TaskDailyCount.objects.all()
+        if since is not None:
+            counters = counters.filter(day__gte=since)
+        counters.delete()
+
+        for timezone_name in settings.TASK_CHART_TIMEZONES:
+            days = (
+                Task.objects.annotate(day=TruncDate("created_at", tzinfo=ZoneInfo(timezone_name)))
+                .values("day", "user_id")
+                .annotate(tasks=Count("id"))
+                .order_by()
+            )
+            if since is not None:
+                days = days.filter(day__gte=since)
+            rows.extend(
+                TaskDailyCount(
+                    timezone=timezone_name, day=row["day"], count=row["tasks"], user_id=row["user_id"] or 0,
+                )
+                for row in days
+            )
+        TaskDailyCount.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def get_chart_timezone(name=None):
+    if not name:
+        return settings.TIME_ZONE
+    if name not in settings.TASK_CHART_TIMEZONES:
+        raise ValidationError({"tz": f"Must be one of {', '.join(settings.TASK_CHART_TIMEZONES)}."})
+    return name
+
+
+def weekly_task_series(user, timezone_name):
+    """
+    Tasks created on each of the last 7 days in `timezone_name`, oldest first,
+    including days without any. Staff see every task, other users their own.
+    """
+    today = timezone.localdate(timezone=ZoneInfo(timezone_name))
+    days = [today - timedelta(days=offset) for offset in range(CHART_DAYS - 1, -1, -1)]
+
+    counters = TaskDailyCount.objects.filter(timezone=timezone_name, day__range=(days[0], today))
+    if not (user.is_staff or user.is_superuser):
+        counters = counters.filter(user_id=user.pk)
+    totals = dict(counters.values("day").annotate(tasks=Sum("count")).values_list("day", "tasks"))
+
+    return [(day, totals.get(day, 0)) for day in days]
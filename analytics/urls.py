@@ -1,5 +1,5 @@
 from django.urls import path, include
-from . import views
+from . import async_views, views
 from rest_framework.routers import DefaultRouter
 router = DefaultRouter()
 router.register(r'activities', views.ActivityLogViewSet, basename='activity')
@@ -9,6 +9,10 @@ urlpatterns = [
     path('task-status-chart/', views.task_status_chart, name='task_status_chart'),
     path('task-weekly-chart/', views.task_weekly_chart, name='task_weekly_chart'),
     path('project-task-summary/<int:project_id>/', views.project_task_summary, name='project_task_summary'),
+    path('activities/async/recent/', async_views.recent_activities, name='async_recent_activities'),
+    path('activities/live/stream/', async_views.live_activities_stream, name='live_activities_stream'),
+    path('activities/live/poll/', views.live_activities_poll, name='live_activities_poll'),
+    path('slow-queries/', views.slow_queries, name='slow_queries'),
     path('', include(router.urls)),
 
 ]
\ No newline at end of file
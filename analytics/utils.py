@@ -1,4 +1,5 @@
 from .models import ActivityLog
+from .retention import get_feed_window_start
 
 def log_activity(user, project, action, description, task=None, metadata=None):
     """
@@ -184,3 +185,48 @@ def log_member_role_change(user, project, member, old_role, new_role):
             'new_role': new_role
         }
     )
+
+
+def get_activity_queryset(user, params):
+    """
+    Activities visible to the user, filtered by query params.
+
+    Supported params: project, task, action, user_id, date_from, date_to.
+    Without date_from only the recent feed window is returned.
+    """
+    if user.is_superadmin():
+        queryset = ActivityLog.objects.all()
+    else:
+        # Get projects where user is a member
+        project_ids = user.project_memberships.values_list('project_id', flat=True)
+        queryset = ActivityLog.objects.filter(project_id__in=project_ids)
+
+    # Apply filters
+    project_id = params.get('project')
+    if project_id:
+        queryset = queryset.filter(project_id=project_id)
+
+    task_id = params.get('task')
+    if task_id:
+        queryset = queryset.filter(task_id=task_id)
+
+    action = params.get('action')
+    if action:
+        queryset = queryset.filter(action=action)
+
+    user_id = params.get('user_id')
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+
+    # Date range filters, bounded to the recent feed window by default
+    date_from = params.get('date_from')
+    if date_from:
+        queryset = queryset.filter(created_at__gte=date_from)
+    else:
+        queryset = queryset.filter(created_at__gte=get_feed_window_start())
+
+    date_to = params.get('date_to')
+    if date_to:
+        queryset = queryset.filter(created_at__lte=date_to)
+
+    return queryset.select_related('user', 'project', 'task')
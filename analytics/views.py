@@ -1,18 +1,120 @@
+import time
+from zoneinfo import ZoneInfo
+
 from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import viewsets, filters
-from django.db.models.functions import TruncDay
-from django.utils.timezone import now, timedelta
+from django.conf import settings
+from django.utils.timezone import timedelta
 from tasks.models import Task
 from django.db.models import Count
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_GET
+from taskflow.db_router import use_replica
+from taskflow.endpoint_cache import cached_endpoint
+from . import live, metrics
 from .models import ActivityLog
 from .serializers import ActivityLogSerializer
+from .slow_queries import slow_query_log
+from .task_counts import get_chart_timezone, weekly_task_series
+from .utils import get_activity_queryset
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus text exposition of analytics.metrics, summed over worker
+    processes. Needs METRICS_TOKEN, except with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=403)
+    elif not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def slow_queries(request):
+    """Slowest query fingerprints of this process by total time; DELETE resets the table"""
+    if request.method == "DELETE":
+        slow_query_log.clear()
+        return Response(status=204)
+
+    return Response({
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "queries": slow_query_log.top(),
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def live_activities_poll(request):
+    """
+    Long-poll for new activities, the WSGI counterpart of the SSE stream.
+
+    Answers as soon as there are activities after `since`, or with an empty
+    list after ACTIVITY_LIVE_POLL_TIMEOUT seconds; the client asks again with
+    the returned `last_id`. Without `since` it answers right away with the id
+    to start from. Not on the replica, which may not have the rows yet when
+    the notification arrives.
+    """
+    user, params = request.user, request.query_params
+    since = live.parse_since(params.get("since"))
+    if since is None:
+        return Response({"activities": [], "last_id": live.latest_activity_id(user, params)})
+
+    deadline = time.monotonic() + settings.ACTIVITY_LIVE_POLL_TIMEOUT
+    with live.get_broker().subscribe(live.subscribed_project_ids(user)) as subscription:
+        activities = list(live.activities_after(user, params, since))
+        while not activities:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            live.release_connections()
+            subscription.wait(remaining)
+            activities = list(live.activities_after(user, params, since))
+
+    serializer = ActivityLogSerializer(activities, many=True)
+    return Response({
+        "activities": serializer.data,
+        "last_id": activities[-1].id if activities else since,
+    })
+
+
+def task_chart_scope(request, **kwargs):
+    """Staff share the charts over every task, other users get their own"""
+    user = request.user
+    if user.is_staff or user.is_superuser:
+        return "staff", ["all"]
+    return f"user:{user.pk}", [f"user:{user.pk}"]
+
+
+def weekly_chart_scope(request, **kwargs):
+    # The week moves at local midnight
+    scope_key, versions = task_chart_scope(request)
+    timezone_name = get_chart_timezone(request.query_params.get("tz"))
+    return f"{scope_key}:{timezone.localdate(timezone=ZoneInfo(timezone_name))}", versions
+
+
+def project_scope(request, project_id=None, **kwargs):
+    """Per user, as results depend on the user's roles; invalidated by the project"""
+    user = request.user
+    project_id = project_id or request.query_params.get("project")
+    roles = f"{user.role}:{user.is_staff:d}{user.is_superuser:d}"
+    return f"user:{user.pk}:{roles}", [f"project:{project_id}"]
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@use_replica
+@cached_endpoint("task_status_chart", scope=task_chart_scope)
 def task_status_chart(request):
     if request.user.is_staff or request.user.is_superuser:
         tasks = Task.objects.all()
@@ -29,28 +131,22 @@ def task_status_chart(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@use_replica
+@cached_endpoint("task_weekly_chart", scope=weekly_chart_scope)
 def task_weekly_chart(request):
-    today = now().date()
-    last_week = today - timedelta(days=6)
-
-    queryset = (
-        Task.objects.filter(created_at__date__gte=last_week)
-        .annotate(day=TruncDay("created_at"))
-        .values("day")
-        .annotate(tasks=Count("id"))
-        .order_by("day")
-    )
-
+    """Tasks created on each of the last 7 days, from the per-day counters"""
+    timezone_name = get_chart_timezone(request.query_params.get("tz"))
     data = [
-        {"name": item["day"].strftime("%a"), "tasks": item["tasks"]}
-        for item in queryset
+        {"name": day.strftime("%a"), "tasks": tasks}
+        for day, tasks in weekly_task_series(request.user, timezone_name)
     ]
-
     return Response(data)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@use_replica
+@cached_endpoint("project_task_summary", scope=project_scope)
 def project_task_summary(request, project_id):
     if request.user.is_staff or request.user.is_superuser  or request.user.role in ["owner", "admin"]:
         project_tasks_summary = Task.objects.filter(project_id=project_id)
@@ -78,6 +174,7 @@ def project_task_summary(request, project_id):
     })  
 
 
+@use_replica
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing activity logs.
@@ -92,42 +189,7 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         """Users see only activities from their projects"""
-        user = self.request.user
-        
-        if user.is_superadmin():
-            queryset = ActivityLog.objects.all()
-        else:
-            # Get projects where user is a member
-            project_ids = user.project_memberships.values_list('project_id', flat=True)
-            queryset = ActivityLog.objects.filter(project_id__in=project_ids)
-        
-        # Apply filters
-        project_id = self.request.query_params.get('project')
-        if project_id:
-            queryset = queryset.filter(project_id=project_id)
-        
-        task_id = self.request.query_params.get('task')
-        if task_id:
-            queryset = queryset.filter(task_id=task_id)
-        
-        action = self.request.query_params.get('action')
-        if action:
-            queryset = queryset.filter(action=action)
-        
-        user_id = self.request.query_params.get('user_id')
-        if user_id:
-            queryset = queryset.filter(user_id=user_id)
-        
-        # Date range filters
-        date_from = self.request.query_params.get('date_from')
-        if date_from:
-            queryset = queryset.filter(created_at__gte=date_from)
-        
-        date_to = self.request.query_params.get('date_to')
-        if date_to:
-            queryset = queryset.filter(created_at__lte=date_to)
-        
-        return queryset.select_related('user', 'project', 'task')
+        return get_activity_queryset(self.request.user, self.request.query_params)
     
     @action(detail=False, methods=['get'])
     def recent(self, request):
@@ -152,6 +214,7 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(cached_endpoint("activity_statistics", scope=project_scope, timeout=120))
     def statistics(self, request):
         """Get activity statistics for a project"""
         project_id = request.query_params.get('project')
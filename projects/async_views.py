@@ -0,0 +1,66 @@
+"""
+Async (ASGI) versions of the read-heavy project endpoints.
+Response bodies match ProjectListCreateView.get and
+ProjectRetrieveUpdateDestroyView.retrieve.
+"""
+from rest_framework import status
+
+from projects.permissions_constant.permission_utils import aget_project_roles, get_project_roles, resolve_permissions
+from taskflow.async_utils import AsyncPage, async_api_view, json_response
+from taskflow.fanout import afan_out
+from tasks.models import Task
+from tasks.utils.task_summary import get_task_summary
+from .models import Project
+from .serializers import ProjectSerializer
+from .utils.pagination import ProjectPagination
+from .utils.project_filters import apply_project_filters, get_base_projects_queryset
+
+
+@async_api_view
+async def project_list(request):
+    user = request.user
+    projects = apply_project_filters(get_base_projects_queryset(user), request.GET, user)
+
+    paginator = AsyncPage(request, ProjectPagination.page_size, ProjectPagination.max_page_size)
+    page = await paginator.paginate(projects)
+
+    user_roles = await aget_project_roles(user, [project.id for project in page])
+    serializer = ProjectSerializer(page, many=True, context={"request": request, "user_roles": user_roles})
+
+    return json_response(paginator.get_paginated_data({
+        "message": "Projects fetched successfully",
+        "projects": serializer.data,
+        "page_size": paginator.page_size,
+        "current_page": paginator.number,
+        "total_pages": paginator.num_pages,
+    }))
+
+
+@async_api_view
+async def project_detail(request, pk):
+    """Project with the user's permissions and task summaries, fetched with fan_out"""
+    user = request.user
+    projects = Project.objects.all() if user.is_superuser else Project.objects.filter(members__user=user)
+
+    calls = {
+        "project": lambda: projects.get(pk=pk),
+        "user_roles": lambda: get_project_roles(user, [pk]),
+        "user_summary": lambda: get_task_summary(Task.objects.filter(project_id=pk, user=user)),
+    }
+    if user.is_staff or user.is_superuser or user.role in ["owner", "admin"]:
+        calls["project_summary"] = lambda: get_task_summary(Task.objects.filter(project_id=pk))
+
+    try:
+        results = await afan_out(calls)
+    except Project.DoesNotExist:
+        return json_response({"detail": "No Project matches the given query."}, status.HTTP_404_NOT_FOUND)
+
+    project = results["project"]
+    user_roles = results["user_roles"]
+    data = ProjectSerializer(project, context={"request": request, "user_roles": user_roles}).data
+    data["permissions"] = resolve_permissions(user.role, user_roles.get(project.id))
+    data["summary"] = {
+        "project_summary": results.get("project_summary"),
+        "user_summary": results["user_summary"],
+    }
+    return json_response(data)
@@ -1,26 +1,116 @@
+from functools import lru_cache
+
 from projects.models import ProjectMember
 from .global_permissions import GLOBAL_PERMISSION
 from .project_role_permissions import PROJECT_ROLE_PERMISSION
 
-def get_user_permissions(user, project):
-    # 1. GLOBAL ROLE
-    global_perms = GLOBAL_PERMISSION.get(user.role, {})
+# One bit per permission. A permission mask holds the granted permissions in
+# the low bits and, shifted by len(PERMISSIONS), the keys the permission dict
+# has at all: members get the keys of their project role, everyone else the
+# keys of their global role.
+PERMISSIONS = tuple(dict.fromkeys(
+    name for table in (GLOBAL_PERMISSION, PROJECT_ROLE_PERMISSION) for perms in table.values() for name in perms
+))
+PERMISSION_BITS = {name: 1 << index for index, name in enumerate(PERMISSIONS)}
+KEYS_SHIFT = len(PERMISSIONS)
+
+
+def _compile(perms):
+    """(granted bits, key bits) of a permission dict"""
+    granted = keys = 0
+    for name, allowed in perms.items():
+        keys |= PERMISSION_BITS[name]
+        if allowed:
+            granted |= PERMISSION_BITS[name]
+    return granted, keys
+
+
+GLOBAL_PERMISSION_MASKS = {role: _compile(perms) for role, perms in GLOBAL_PERMISSION.items()}
+PROJECT_ROLE_PERMISSION_MASKS = {role: _compile(perms) for role, perms in PROJECT_ROLE_PERMISSION.items()}
+
+
+@lru_cache(maxsize=None)
+def permission_mask(global_role, project_role):
+    """
+    The permission mask of a global role combined with an optional project
+    role. An int, so it can be cached or stored as is.
+    """
+    granted, keys = GLOBAL_PERMISSION_MASKS.get(global_role, (0, 0))
+
+    # Superadmins and non-members only get their global permissions
+    if global_role != "superadmin" and project_role is not None:
+        project_granted, keys = PROJECT_ROLE_PERMISSION_MASKS[project_role]
+        # OR logic, True wins, over the project role's keys
+        granted = (granted | project_granted) & keys
+
+    return granted | keys << KEYS_SHIFT
+
+
+@lru_cache(maxsize=None)
+def _permissions_for_mask(mask):
+    # Never handed out, callers get copies they may change
+    granted, keys = mask & ((1 << KEYS_SHIFT) - 1), mask >> KEYS_SHIFT
+    return {name: bool(granted & bit) for name, bit in PERMISSION_BITS.items() if keys & bit}
 
-    # If superadmin -> full permissions
+
+def permissions_from_mask(mask):
+    """The permission dict of a mask, as sent to the frontend"""
+    return _permissions_for_mask(mask).copy()
+
+
+@lru_cache(maxsize=None)
+def _permissions_for_roles(global_role, project_role):
+    return _permissions_for_mask(permission_mask(global_role, project_role))
+
+
+def resolve_permissions(global_role, project_role):
+    """Combine a global role and an optional project role into a permission dict"""
+    return _permissions_for_roles(global_role, project_role).copy()
+
+
+def get_user_permissions(user, project):
     if user.role == "superadmin":
-        return global_perms
+        return resolve_permissions(user.role, None)
 
-    # 2. Check if user is project member
+    # Check if user is project member
     try:
         member = ProjectMember.objects.get(user=user, project=project)
         project_role = member.role
     except ProjectMember.DoesNotExist:
-        # Not a member → return ONLY global permissions
-        return global_perms
+        project_role = None
+
+    return resolve_permissions(user.role, project_role)
+
+
+def get_project_roles(user, project_ids):
+    """Map project id -> the user's role, for every project the user belongs to, in one query"""
+    return dict(
+        ProjectMember.objects
+        .filter(user=user, project_id__in=project_ids)
+        .values_list("project_id", "role")
+    )
+
 
-    project_perms = PROJECT_ROLE_PERMISSION[project_role]
+async def aget_project_roles(user, project_ids):
+    return {
+        project_id: role
+        async for project_id, role in ProjectMember.objects
+        .filter(user=user, project_id__in=project_ids)
+        .values_list("project_id", "role")
+    }
 
-    # 3. Combine → OR logic (True wins)
-    final = {key: (global_perms.get(key, False) or project_perms.get(key, False)) for key in project_perms.keys()}
 
-    return final
+def build_permissions_map(user, project_ids, project_roles):
+    """
+    Map project id -> permissions, for serializers that render many projects.
+    Pass the result as the `project_permissions` serializer context.
+    Projects where the user has the same role share one dict.
+    """
+    by_role = {}
+    permissions = {}
+    for project_id in project_ids:
+        role = project_roles.get(project_id)
+        if role not in by_role:
+            by_role[role] = resolve_permissions(user.role, role)
+        permissions[project_id] = by_role[role]
+    return permissions
@@ -21,6 +21,11 @@ class ProjectSerializer(ModelSerializer):
         if not request:
             return None
 
+        # Precomputed by list views to avoid a membership query per project
+        user_roles = self.context.get('user_roles')
+        if user_roles is not None:
+            return user_roles.get(obj.id)
+
         membership = ProjectMember.objects.filter(
             user=request.user,
             project=obj
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tasks.models import Task
+from .models import Project, ProjectMember
+from .utils.versioning import bump_project_version
+
+
+@receiver(post_save, sender=Task)
+def task_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # A task moved to another project changes both projects
+    bump_project_version(instance.project_id, instance._loaded and instance._loaded[0])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    bump_project_version(instance.project_id)
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def membership_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_project_version(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_project_version(instance.pk)
@@ -1,3 +1,199 @@
-from django.test import TestCase
+import contextvars
+import threading
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from projects.models import Project, ProjectMember
+from projects.permissions_constant.global_permissions import GLOBAL_PERMISSION
+from projects.permissions_constant.permission_utils import (
+    permission_mask, permissions_from_mask, resolve_permissions,
+)
+from projects.permissions_constant.project_role_permissions import PROJECT_ROLE_PERMISSION
+from taskflow.fanout import afan_out, fan_out
+from taskflow.testing import TEST_CACHES, QueryCountTestCase
+from tasks.models import Task
+from users.models import User
+from users.utils.provisioning import clear_role_permission_cache
+
+
+class ProjectQueryCountTests(QueryCountTestCase):
+    def test_project_list(self):
+        # count, page, the user's roles in the page's projects
+        for user in (self.superadmin, self.staff, self.member):
+            self.assertPageQueryCount(3, user, "/api/projects/")
+
+    def test_project_detail(self):
+        # project, roles, the user's summary, and the project summary for staff
+        self.assertQueryCount(4, self.staff, f"/api/projects/{self.project.pk}/")
+
+    def test_async_project_detail(self):
+        path = f"/api/projects/{self.project.pk}/async/"
+        self.assertQueryCount(4, self.staff, path)
+        response = self.client_for(self.staff).get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"]["project_summary"]["total_tasks"], self.project.tasks.count())
+        self.assertEqual(self.client_for(self.outsider).get(path).status_code, 404)
+        self.assertQueryCount(3, self.member, f"/api/projects/{self.project.pk}/")
+
+    def test_project_members(self):
+        # project, members, their open tasks, tasks of non-members
+        self.assertQueryCount(
+            4, self.staff,
+            f"/api/projects/{self.project.pk}/members/",
+            f"/api/projects/{self.other_project.pk}/members/",
+        )
+
+
+class ProjectConditionalGetTests(QueryCountTestCase):
+    def test_project_detail(self):
+        path = f"/api/projects/{self.project.pk}/"
+        etag = self.assertNotModified(1, self.member, path)
+        # ETags are per user
+        self.assertModified(self.staff, path, etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.description = "Changed"
+            self.project.save()
+        self.assertModified(self.member, path, etag)
+
+    def test_project_detail_follows_its_tasks(self):
+        path = f"/api/projects/{self.project.pk}/"
+        etag = self.assertNotModified(1, self.staff, path)
+
+        task = self.tasks[1]
+        self.assertEqual(task.project, self.project)
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = "done"
+            task.save()
+        self.assertModified(self.staff, path, etag)
+
+    def test_project_members(self):
+        path = f"/api/projects/{self.other_project.pk}/members/"
+        etag = self.assertNotModified(1, self.staff, path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectMember.objects.filter(project=self.other_project, user=self.outsider).delete()
+        self.assertModified(self.staff, path, etag)
+
+    def test_moving_a_task_changes_both_projects(self):
+        paths = [f"/api/projects/{project.pk}/members/" for project in (self.project, self.other_project)]
+        etags = [self.assertNotModified(1, self.staff, path) for path in paths]
+
+        task = self.tasks[1]
+        self.assertEqual(task.project, self.project)
+        with self.captureOnCommitCallbacks(execute=True):
+            task.project = self.other_project
+            task.save()
+        for path, etag in zip(paths, etags):
+            self.assertModified(self.staff, path, etag)
+
+
+class PermissionMaskTests(SimpleTestCase):
+    def test_masks_match_the_permission_tables(self):
+        for global_role, global_perms in GLOBAL_PERMISSION.items():
+            self.assertEqual(list(resolve_permissions(global_role, None).items()), list(global_perms.items()))
+
+            for project_role, project_perms in PROJECT_ROLE_PERMISSION.items():
+                if global_role == "superadmin":
+                    expected = global_perms
+                else:
+                    expected = {key: global_perms.get(key, False) or allowed for key, allowed in project_perms.items()}
+                permissions = resolve_permissions(global_role, project_role)
+                self.assertEqual(list(permissions.items()), list(expected.items()), (global_role, project_role))
+
+    def test_masks_round_trip(self):
+        mask = permission_mask("staff", "viewer")
+        self.assertIsInstance(mask, int)
+        self.assertEqual(permissions_from_mask(mask), resolve_permissions("staff", "viewer"))
+        self.assertEqual(resolve_permissions("unknown", None), {})
+
+        # Callers get their own dict
+        resolve_permissions("user", "owner")["can_delete_project"] = False
+        self.assertTrue(resolve_permissions("user", "owner")["can_delete_project"])
+
+
+_request_user = contextvars.ContextVar("request_user", default=None)
+
+
+@override_settings(CACHES=TEST_CACHES, FANOUT_MAX_WORKERS=4)
+class FanOutTests(TransactionTestCase):
+    """fan_out on real pool threads, which only see committed rows"""
+
+    def setUp(self):
+        # Permission ids change when the database is flushed between tests
+        clear_role_permission_cache()
+        owner = User.objects.create(username="owner", role="staff", is_staff=True)
+        self.project = Project.objects.create(name="Apollo", created_by=owner)
+        Task.objects.create(name="Launch", project=self.project, user=owner)
+
+    def persistent_connections(self):
+        for conn in connections.all():
+            self.addCleanup(conn.settings_dict.__setitem__, "CONN_MAX_AGE", conn.settings_dict["CONN_MAX_AGE"])
+            conn.settings_dict["CONN_MAX_AGE"] = 60
+
+    def work(self):
+        def count_tasks():
+            return threading.current_thread().name, _request_user.get(), Task.objects.filter(project=self.project).count()
+
+        def count_projects():
+            return threading.current_thread().name, _request_user.get(), Project.objects.count()
+
+        return {"tasks": count_tasks, "projects": count_projects}
+
+    def test_runs_on_pool_threads_with_the_callers_context(self):
+        self.persistent_connections()
+        _request_user.set("owner")
+        results = fan_out(self.work())
+
+        self.assertEqual([result[1:] for result in results.values()], [("owner", 1), ("owner", 1)])
+        self.assertTrue(all(name.startswith("fanout") for name, _, _ in results.values()))
+
+    def test_pool_threads_clean_up_their_connections_after_each_call(self):
+        self.persistent_connections()
+        cleanup = BaseDatabaseWrapper.close_if_unusable_or_obsolete
+        events = []
+
+        def record_cleanup(conn):
+            events.append((threading.current_thread().name, "cleanup"))
+            return cleanup(conn)
+
+        def traced(func):
+            def call():
+                result = func()
+                events.append((threading.current_thread().name, "work"))
+                return result
+            return call
+
+        calls = {name: traced(func) for name, func in self.work().items()}
+        with mock.patch.object(BaseDatabaseWrapper, "close_if_unusable_or_obsolete", autospec=True, side_effect=record_cleanup):
+            fan_out(calls)
+
+        # The connection a call used is checked before its thread picks up other work
+        for thread in {name for name, event in events if event == "work"}:
+            thread_events = [event for name, event in events if name == thread]
+            self.assertEqual(thread_events[-1], "cleanup", thread_events)
+            self.assertTrue(thread.startswith("fanout"))
+        self.assertEqual(sum(event == "work" for _, event in events), 2)
+
+    def test_async_callers_use_the_pool(self):
+        self.persistent_connections()
+        results = async_to_sync(afan_out)(self.work())
+        self.assertEqual([result[2] for result in results.values()], [1, 1])
+        self.assertTrue(all(name.startswith("fanout") for name, _, _ in results.values()))
+
+    def test_runs_inline_without_persistent_connections(self):
+        results = fan_out(self.work())
+        self.assertEqual({name for name, _, _ in results.values()}, {threading.current_thread().name})
+
+    def test_reraises_the_first_exception(self):
+        self.persistent_connections()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaisesMessage(ValueError, "boom"):
+            fan_out({**self.work(), "fail": fail})
@@ -0,0 +1,45 @@
+from django.db.models import Q, F, Max
+from django.db.models.functions import Coalesce
+from ..models import Project
+
+
+def get_base_projects_queryset(user):
+    """
+    Return projects visible to the user, most recently active first
+    """
+    if user.is_superuser:
+        qs = Project.objects.all()
+    else:
+        # qs = Project.objects.filter(members__user=user).exclude(members__role ="viewer")
+        qs = Project.objects.filter(members__user=user)
+
+    return qs.annotate(
+        last_activity=Coalesce(
+            Max("tasks__updated_at"),
+            F("updated_at"),
+            F("created_at")
+        )
+    ).order_by('-last_activity')
+
+
+def apply_project_filters(queryset, params, user):
+    """
+    Apply query param based filters
+    """
+    role = params.get("role")
+    if role:
+        queryset = queryset.filter(project__id=role)
+
+    search_filter = params.get("search")
+    if search_filter:
+        queryset = queryset.filter(
+            Q(name__icontains=search_filter) |
+            Q(description__icontains=search_filter) 
+            # Q(comments__icontains=search_filter)
+        )
+
+    role_filter = params.get("role_filter")
+    if role_filter:
+        queryset = queryset.filter(members__role=role_filter, members__user=user) 
+
+    return queryset
@@ -0,0 +1,38 @@
+"""
+Per-project version counters for conditional GETs.
+
+Every change that can show up in a project's detail, its members list or the
+detail of one of its tasks bumps the project's version once the transaction
+commits (see projects/signals.py). Views fold the version into their ETag,
+so polling an unchanged resource is answered with a 304 before any
+serializer work.
+
+Versions are counters from taskflow/version_counters.py, so a version lost
+to eviction is never reissued to a client that may still hold its ETag.
+Writes that skip model signals, such as bulk_create or QuerySet.update,
+must call bump_project_version themselves.
+"""
+from django.db import transaction
+
+from taskflow.version_counters import bump_version, get_version
+
+PROJECT_VERSION_KEY = "project_version:{project_id}"
+# Expiring only costs clients one full response, and keeps keys of deleted
+# or never existing projects from piling up
+PROJECT_VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def get_project_version(project_id):
+    return get_version(PROJECT_VERSION_KEY.format(project_id=project_id), PROJECT_VERSION_TIMEOUT)
+
+
+def bump_project_version(*project_ids):
+    """Change the version of these projects once the current transaction commits"""
+    project_ids = {project_id for project_id in project_ids if project_id is not None}
+    if project_ids:
+        transaction.on_commit(lambda: _bump(project_ids))
+
+
+def _bump(project_ids):
+    for project_id in project_ids:
+        bump_version(PROJECT_VERSION_KEY.format(project_id=project_id), PROJECT_VERSION_TIMEOUT)
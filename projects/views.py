@@ -5,15 +5,23 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from projects.permissions import IsProjectOwner, CanCreateProject, CanUpdateDeleteProject
-from projects.permissions_constant.permission_utils import get_user_permissions
+from projects.permissions_constant.permission_utils import get_project_roles, resolve_permissions
 from projects.serializers import ProjectMemberAddSerializer, ProjectSerializer
+from taskflow.db_router import use_replica
+from taskflow.etags import make_etag, not_modified, with_etag
+from taskflow.fanout import fan_out
 from tasks.models import Task
+from tasks.utils.task_summary import get_task_summary
 from .utils.pagination import ProjectPagination
+from .utils.versioning import get_project_version
+from .utils.project_filters import apply_project_filters, get_base_projects_queryset
 from .models import Project, ProjectMember
-from django.db.models import Q, Prefetch, F, Max, Case, When, IntegerField, Value, Prefetch
-from django.db.models.functions import Coalesce
+from django.db.models import Case, When, IntegerField, Value, F, Window
+from django.db.models.functions import RowNumber
+from users.utils.user_directory import get_user_directory, get_user_directory_version
 
 
+@use_replica
 class ProjectListCreateView(ListCreateAPIView):
     permission_classes = [IsAuthenticated, CanCreateProject]
     serializer_class = ProjectSerializer
@@ -21,21 +29,7 @@ class ProjectListCreateView(ListCreateAPIView):
     pagination_class = ProjectPagination
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            qs = Project.objects.all()
-        else:
-            # qs = Project.objects.filter(members__user=user).exclude(members__role ="viewer")
-            qs = Project.objects.filter(members__user=user)
-
-        qs = qs.annotate(
-            last_activity=Coalesce(
-                Max("tasks__updated_at"),
-                F("updated_at"),
-                F("created_at")
-            )
-        ).order_by('-last_activity')
-        return qs
+        return get_base_projects_queryset(self.request.user)
 
     # Custom POST Response
     def create(self, request, *args, **kwargs):
@@ -53,26 +47,14 @@ class ProjectListCreateView(ListCreateAPIView):
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
 
-        role = request.query_params.get("role")
-        if role:
-            queryset = queryset.filter(project__id=role)
-
-        search_filter = request.query_params.get("search")
-        if search_filter:
-            queryset = queryset.filter(
-                Q(name__icontains=search_filter) |
-                Q(description__icontains=search_filter) 
-                # Q(comments__icontains=search_filter)
-            )
-        
-        role_filter = request.query_params.get("role_filter")
-        if role_filter:
-            queryset = queryset.filter(members__role=role_filter, members__user=request.user) 
+        queryset = apply_project_filters(queryset, request.query_params, request.user)
 
         paginator = self.pagination_class()
         paginated_projects = paginator.paginate_queryset(queryset, request)
 
-        serializer = ProjectSerializer(paginated_projects, many=True, context={'request': request})
+        # One membership query for the whole page instead of one per project
+        user_roles = get_project_roles(request.user, [project.id for project in paginated_projects])
+        serializer = ProjectSerializer(paginated_projects, many=True, context={'request': request, 'user_roles': user_roles})
 
         return paginator.get_paginated_response({
             "message": "Projects fetched successfully",
@@ -96,42 +78,39 @@ class ProjectRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
         return Project.objects.filter(members__user=user)
     
     def retrieve(self, request, *args, **kwargs):
-            project = self.get_object()   # DRF handles 404 safely
-            serializer = self.get_serializer(project)
-            project_summary = None
-
-            # 🔥 Get dynamic permissions for the requesting user
-            perms = get_user_permissions(request.user, project)
-
-            if request.user.is_staff or request.user.is_superuser  or request.user.role in ["owner", "admin"]:
-                project_tasks_summary = Task.objects.filter(project_id=project.id)
-                user_task_summary = Task.objects.filter(project_id=project.id, user=request.user)
-
-                project_summary = {
-                    "total_tasks": project_tasks_summary.count(),
-                    "todo_tasks": project_tasks_summary.filter(status="todo").count(),
-                    "in_progress_tasks": project_tasks_summary.filter(status="progress").count(),
-                    "completed_tasks": project_tasks_summary.filter(status="done").count(),
-                }
-
-            else:
-                user_task_summary = Task.objects.filter(user=request.user, project_id=project.id)
-
-            user_summary = {
-                "total_tasks": user_task_summary.count(),
-                "todo_tasks": user_task_summary.filter(status="todo").count(),
-                "in_progress_tasks": user_task_summary.filter(status="progress").count(),
-                "completed_tasks": user_task_summary.filter(status="done").count(),
-            }
-
-            # Merge the data with custom permissions
-            data = serializer.data
-            data["permissions"] = perms
-            data["summary"] = {
-                    "project_summary": project_summary,
-                    "user_summary": user_summary
-                }
-            return Response(data)
+        user = request.user
+        project_id = kwargs[self.lookup_field]
+
+        # Version first: anything read after it is at least as new
+        etag = make_etag(
+            "project", project_id, user.pk, user.role, user.is_staff, user.is_superuser,
+            get_project_version(project_id),
+        )
+        project = self.get_object()   # DRF handles 404 safely
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        # Independent sub-queries, run concurrently on separate connections
+        calls = {
+            "user_roles": lambda: get_project_roles(user, [project_id]),
+            "user_summary": lambda: get_task_summary(Task.objects.filter(project_id=project_id, user=user)),
+        }
+        if user.is_staff or user.is_superuser or user.role in ["owner", "admin"]:
+            calls["project_summary"] = lambda: get_task_summary(Task.objects.filter(project_id=project_id))
+        results = fan_out(calls)
+
+        user_roles = results["user_roles"]
+        serializer = self.get_serializer(project, context={**self.get_serializer_context(), "user_roles": user_roles})
+
+        # Merge the data with custom permissions
+        data = serializer.data
+        data["permissions"] = resolve_permissions(user.role, user_roles.get(project.id))
+        data["summary"] = {
+            "project_summary": results.get("project_summary"),
+            "user_summary": results["user_summary"],
+        }
+        return with_etag(Response(data), etag)
 
 
 class AddProjectMemberView(APIView):
@@ -160,31 +139,24 @@ class AddProjectMemberView(APIView):
         return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@use_replica
 class ListProjectMembersView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
+        etag = make_etag(
+            "members", pk, request.user.pk, get_project_version(pk), get_user_directory_version(),
+        )
         project = get_object_or_404(Project, id=pk)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
 
-        # Fetch ONLY members
-
-        # members_qs = (
-        #     ProjectMember.objects.filter(project=project)
-        #     .select_related("user")
-        #     .prefetch_related(
-        #         Prefetch(
-        #             "user__assigned_tasks",
-        #             queryset=Task.objects.filter(project=project).order_by('-created_at')[:10],
-        #             to_attr="project_tasks"
-        #         )
-        #     )
-        # )
-
+        # Fetch ONLY members, user details come from the cached user directory
         # Order requesting user first
-        members_qs = (
+        members = list(
             ProjectMember.objects
             .filter(project=project)
-            .select_related("user")
             .annotate(
                 is_me=Case(
                     When(user=request.user, then=Value(0)),  # requested user first
@@ -193,61 +165,70 @@ class ListProjectMembersView(APIView):
                 )
             )
             .order_by("is_me", "joined_at")  # keep stable order
-            .prefetch_related(
-                Prefetch(
-                    "user__assigned_tasks",
-                    queryset=Task.objects.filter(project=project, status__in=["todo", "progress"]).order_by("-created_at")[:10],
-                    to_attr="project_tasks"
+            .values_list("user_id", "role", "joined_at")
+        )
+        member_user_ids = [user_id for user_id, _, _ in members]
+
+        # Latest 10 open tasks per member, in a single query
+        open_tasks = (
+            Task.objects
+            .filter(project=project, status__in=["todo", "progress"], user_id__in=member_user_ids)
+            .annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F("user_id"),
+                    order_by=F("created_at").desc(),
                 )
             )
+            .filter(row_number__lte=10)
+            .order_by("user_id", "row_number")
+            .values("id", "name", "status", "priority", "due_date", "user_id")
         )
+        tasks_by_user = {}
+        for task in open_tasks:
+            tasks_by_user.setdefault(task.pop("user_id"), []).append(task)
 
         # Fetch tasks created by users NOT in members list (superadmins/staff)
-        member_user_ids = members_qs.values_list("user_id", flat=True)
+        system_tasks = list(
+            Task.objects.filter(project=project)
+            .exclude(user_id__in=member_user_ids)
+            .values("id", "name", "status", "priority", "due_date", "user_id")
+        )
 
-        system_tasks = Task.objects.filter(project=project).exclude(user_id__in=member_user_ids)
+        directory = get_user_directory()
+        users = directory.get_many(
+            member_user_ids + [t["user_id"] for t in system_tasks if t["user_id"]]
+        )
 
         # Build members list
         project_members = []
-        for m in members_qs:
-            user = m.user
-            tasks_for_user = getattr(user, "project_tasks", [])
+        for user_id, role, joined_at in members:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            tasks_for_user = tasks_by_user.get(user_id, [])
 
             project_members.append({
                 "id": user.id,
                 "username": user.username,
                 "email": user.email,
-                "job_role": (user.job_role.replace("_", " ").title() if user.job_role else None),
+                "job_role": user.job_role_label,
                 "department": user.department,
                 "designation": user.designation,
-                "project_role": m.role,
-                "joined_at": m.joined_at,
-                "tasks": [
-                    {
-                        "id": t.id,
-                        "name": t.name,
-                        "status": t.status,
-                        "priority": t.priority,
-                        "due_date": t.due_date,
-                    } for t in tasks_for_user
-                ],
+                "project_role": role,
+                "joined_at": joined_at,
+                "tasks": tasks_for_user,
                 "tasks_count": len(tasks_for_user),
             })
 
         # Return superadmin tasks in a separate key
-        system_tasks_list = [
-            {
-                "id": t.id,
-                "name": t.name,
-                "status": t.status,
-                "priority": t.priority,
-                "due_date": t.due_date,
-                "created_by": t.user.username,
-            }
-            for t in system_tasks
-        ]
+        system_tasks_list = []
+        for t in system_tasks:
+            creator = users.get(t.pop("user_id"))
+            t["created_by"] = creator.username if creator else None
+            system_tasks_list.append(t)
 
-        return Response(
+        return with_etag(Response(
             {
                 "project_id": project.id,
                 "members_count": len(project_members),
@@ -255,7 +236,7 @@ class ListProjectMembersView(APIView):
                 "system_tasks_count": len(system_tasks_list),
                 "system_tasks": system_tasks_list,
             }, status=200
-        )
+        ), etag)
 
 
 class RemoveProjectMemberView(APIView):
@@ -0,0 +1,118 @@
+"""
+Helpers for the async (ASGI) read endpoints.
+DRF's APIView is sync only, so the async views are plain Django coroutine
+views. These helpers give them the same authentication, pagination and error
+shapes as their DRF counterparts.
+"""
+import math
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, safe=False, encoder=DjangoJSONEncoder)
+
+
+async def aauthenticate(request):
+    """
+    Run the configured DRF authentication classes in a worker thread.
+    Sets and returns `request.user`.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    # Reading `.user` authenticates and copies the user onto the HttpRequest
+    return await sync_to_async(lambda: drf_request.user)()
+
+
+def async_api_view(view):
+    """
+    Wrap an async read-only view: allow GET/HEAD only, require an authenticated
+    user and render DRF exceptions as JSON.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return json_response(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+
+        try:
+            user = await aauthenticate(request)
+            if not user or not user.is_authenticated:
+                return json_response(
+                    {"detail": "Authentication credentials were not provided."},
+                    status.HTTP_401_UNAUTHORIZED,
+                )
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            return json_response({"detail": exc.detail}, exc.status_code)
+
+    return wrapper
+
+
+class AsyncPage:
+    """Page-number pagination over a queryset using the async ORM"""
+
+    def __init__(self, request, page_size, max_page_size, page_size_query_param="page_size"):
+        self.request = request
+        self.page_size = self._get_page_size(page_size, max_page_size, page_size_query_param)
+        self.number = 1
+        self.count = 0
+        self.num_pages = 1
+
+    def _get_page_size(self, default, maximum, query_param):
+        try:
+            requested = int(self.request.GET[query_param])
+        except (KeyError, ValueError):
+            return default
+        return min(requested, maximum) if requested > 0 else default
+
+    async def paginate(self, queryset):
+        """Return the objects of the requested page, raises NotFound for an invalid page"""
+        self.count = await queryset.acount()
+        self.num_pages = max(1, math.ceil(self.count / self.page_size))
+
+        page = self.request.GET.get("page", 1)
+        if page == "last":
+            page = self.num_pages
+        try:
+            self.number = int(page)
+        except (TypeError, ValueError):
+            raise NotFound("Invalid page.")
+        if not 1 <= self.number <= self.num_pages:
+            raise NotFound("Invalid page.")
+
+        start = (self.number - 1) * self.page_size
+        return [obj async for obj in queryset[start:start + self.page_size].aiterator()]
+
+    def get_next_link(self):
+        if self.number >= self.num_pages:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), "page", self.number + 1)
+
+    def get_previous_link(self):
+        if self.number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.number == 2:
+            return remove_query_param(url, "page")
+        return replace_query_param(url, "page", self.number - 1)
+
+    def get_paginated_data(self, results):
+        return {
+            "count": self.count,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": results,
+        }
@@ -0,0 +1,224 @@
+"""
+In-process API benchmarks for the hot read paths.
+
+Requests go through the real URL routes, middleware and views with DRF's
+APIClient, against a database filled by taskflow.seeding. Every endpoint is
+measured for p50/p95 latency, SQL queries and rows fetched per request, and
+the results can be compared with a committed baseline so regressions fail
+loudly.
+
+Sub-queries that fan_out would run on other threads are counted only when
+they run on the calling thread, so benchmarks are run with fan-out inline.
+"""
+import json
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.utils import CursorWrapper
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from projects.models import Project, ProjectMember
+from tasks.models import Task
+from users.models import User
+
+
+class QueryStats:
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+
+class _CountingCursorWrapper(CursorWrapper):
+    """Counts executed statements and the rows fetched from them"""
+
+    def __init__(self, cursor, db, stats):
+        super().__init__(cursor, db)
+        self.stats = stats
+
+    def execute(self, sql, params=None):
+        self.stats.queries += 1
+        return super().execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.stats.queries += 1
+        return super().executemany(sql, param_list)
+
+    def fetchone(self):
+        row = super().__getattr__("fetchone")()
+        if row is not None:
+            self.stats.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().__getattr__("fetchmany")(*args, **kwargs)
+        self.stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().__getattr__("fetchall")()
+        self.stats.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in super().__iter__():
+            self.stats.rows += 1
+            yield row
+
+
+@contextmanager
+def count_queries(using=DEFAULT_DB_ALIAS):
+    """Count queries and fetched rows on this thread's connection for `using`"""
+    connection = connections[using]
+    stats = QueryStats()
+
+    def make_cursor(cursor):
+        return _CountingCursorWrapper(cursor, connection, stats)
+
+    connection.make_cursor = connection.make_debug_cursor = make_cursor
+    try:
+        yield stats
+    finally:
+        del connection.make_cursor, connection.make_debug_cursor
+
+
+@dataclass
+class Endpoint:
+    name: str
+    # Path template, formatted with the BenchmarkContext attributes
+    path: str
+    personas: tuple = ("superadmin", "member")
+
+
+ENDPOINTS = [
+    Endpoint("task_list", "/api/tasks/?page_size=50"),
+    Endpoint("task_search", "/api/tasks/?search={search_term}"),
+    Endpoint("project_list", "/api/projects/"),
+    Endpoint("project_detail", "/api/projects/{project_id}/"),
+    Endpoint("project_members", "/api/projects/{project_id}/members/"),
+    Endpoint("activity_feed", "/api/analytics/activities/"),
+    Endpoint("activity_statistics", "/api/analytics/activities/statistics/?project={project_id}"),
+    Endpoint("task_status_chart", "/api/analytics/task-status-chart/"),
+    Endpoint("task_weekly_chart", "/api/analytics/task-weekly-chart/"),
+    Endpoint("project_task_summary", "/api/analytics/project-task-summary/{project_id}/"),
+]
+
+
+class BenchmarkContext:
+    """
+    Picks the objects the endpoints are measured against: the project with
+    the most tasks, a superadmin, and a plain user who is an active member
+    of that project.
+    """
+
+    def __init__(self):
+        project = (
+            Project.objects.annotate(task_count=Count("tasks"))
+            .order_by("-task_count", "pk")
+            .first()
+        )
+        if project is None:
+            raise ValueError("The benchmark database has no projects, seed it first")
+        self.project_id = project.pk
+
+        member = (
+            ProjectMember.objects
+            .filter(project=project, user__role="user", role__in=["admin", "member"])
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+            .first()
+        )
+        self.users = {
+            "superadmin": User.objects.filter(is_superuser=True).order_by("pk").first(),
+            "member": User.objects.filter(pk=member).first(),
+        }
+
+        name = Task.objects.filter(project=project).order_by("pk").values_list("name", flat=True).first() or ""
+        self.search_term = name.split()[0].lower() if name else "task"
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def benchmark_endpoint(client, path, iterations, warmup):
+    for _ in range(warmup):
+        client.get(path)
+
+    timings = []
+    for _ in range(iterations):
+        with count_queries() as stats:
+            start = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise AssertionError(f"GET {path} returned {response.status_code}")
+
+    return {
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        # Identical on every iteration once warm, the last one is reported
+        "queries": stats.queries,
+        "rows": stats.rows,
+    }
+
+
+def run_benchmarks(iterations=20, warmup=2, endpoints=ENDPOINTS, only=None):
+    """Return {"<endpoint>[<persona>]": metrics} for every endpoint and persona"""
+    context = BenchmarkContext()
+    results = {}
+    for endpoint in endpoints:
+        if only and endpoint.name not in only:
+            continue
+        path = endpoint.path.format(**vars(context))
+        for persona in endpoint.personas:
+            user = context.users.get(persona)
+            if user is None:
+                continue
+            client = APIClient()
+            client.force_authenticate(user)
+            results[f"{endpoint.name}[{persona}]"] = benchmark_endpoint(client, path, iterations, warmup)
+    return results
+
+
+def compare_with_baseline(results, baseline, latency_tolerance=1.0, rows_tolerance=0.0, latency_floor_ms=10.0):
+    """
+    Return a list of regressions against `baseline["endpoints"]`.
+
+    Query counts may not grow at all. Rows and p95 latency may grow by the
+    given fractions. Latency differences under `latency_floor_ms` are noise:
+    a sub-millisecond endpoint doubles on a busy machine, so small endpoints
+    are effectively gated on their query and row counts.
+    """
+    regressions = []
+    for key, current in results.items():
+        expected = baseline.get("endpoints", {}).get(key)
+        if expected is None:
+            continue
+
+        if current["queries"] > expected["queries"]:
+            regressions.append(f"{key}: {current['queries']} queries, baseline {expected['queries']}")
+
+        if current["rows"] > expected["rows"] * (1 + rows_tolerance):
+            regressions.append(f"{key}: {current['rows']} rows fetched, baseline {expected['rows']}")
+
+        allowed = max(expected["p95_ms"] * (1 + latency_tolerance), expected["p95_ms"] + latency_floor_ms)
+        if current["p95_ms"] > allowed:
+            regressions.append(f"{key}: p95 {current['p95_ms']}ms, baseline {expected['p95_ms']}ms")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_baseline(path, results, **meta):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**meta, "endpoints": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,135 @@
+"""
+Read replica routing.
+
+With a `replica` database configured (DATABASE_REPLICA_URL, see
+taskflow/database.py), views decorated with `use_replica` run the reads of
+their GET, HEAD and OPTIONS requests on the replica. Writes, and reads
+anywhere else, stay on the primary.
+
+Replicas lag behind the primary, so a client that has just written is pinned
+to the primary for REPLICA_STICKY_SECONDS. ReplicaStickinessMiddleware marks
+it after every successful unsafe request, with a cookie for the browser
+client and a per-user cache key for clients that only send a bearer token.
+
+The decision is kept in a ContextVar, so it is isolated per thread and per
+asyncio task like the activity context in analytics/context.py.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .database import REPLICA_ALIAS
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def get_replica_alias():
+    """The replica alias if one is configured, else None"""
+    return REPLICA_ALIAS if REPLICA_ALIAS in connections.settings else None
+
+
+def sticky_cache_key(user_id):
+    return f"db_sticky:{user_id}"
+
+
+def mark_primary_sticky(request, response):
+    """Pin the client of `request` to the primary for REPLICA_STICKY_SECONDS"""
+    seconds = settings.REPLICA_STICKY_SECONDS
+    response.set_cookie(
+        settings.REPLICA_STICKY_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax",
+    )
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        cache.set(sticky_cache_key(user.pk), True, seconds)
+
+
+def is_primary_sticky(request):
+    if request.COOKIES.get(settings.REPLICA_STICKY_COOKIE):
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and cache.get(sticky_cache_key(user.pk)))
+
+
+def replica_reads_allowed(request):
+    return (
+        request.method in SAFE_METHODS
+        and get_replica_alias() is not None
+        and not is_primary_sticky(request)
+    )
+
+
+def reading_from_replica():
+    """Whether reads in the current context go to the replica"""
+    return _replica_reads.get() and get_replica_alias() is not None
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route the reads inside the block to the replica, when one is configured"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_replica(view):
+    """
+    Serve the safe requests of a view from the replica.
+
+    Works on function views, below @api_view so it sees the authenticated
+    request, and on APIView classes, where authentication and permission
+    checks still run on the primary.
+    """
+    if isinstance(view, type):
+        return _use_replica_for_class(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with replica_reads(replica_reads_allowed(request)):
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+def _use_replica_for_class(view_class):
+    initial = view_class.initial
+    finalize_response = view_class.finalize_response
+
+    def replica_initial(self, request, *args, **kwargs):
+        initial(self, request, *args, **kwargs)
+        self._replica_token = _replica_reads.set(replica_reads_allowed(request))
+
+    def replica_finalize_response(self, request, response, *args, **kwargs):
+        # Also runs when the handler raised, so the context never leaks
+        token = self.__dict__.pop("_replica_token", None)
+        if token is not None:
+            _replica_reads.reset(token)
+        return finalize_response(self, request, response, *args, **kwargs)
+
+    view_class.initial = replica_initial
+    view_class.finalize_response = replica_finalize_response
+    return view_class
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return get_replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, otherwise saving an instance read from the replica would
+        # write to the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        return db != REPLICA_ALIAS
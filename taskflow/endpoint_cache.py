@@ -0,0 +1,129 @@
+"""
+Result caching for read-mostly API views.
+
+`cached_endpoint` caches the data of a view's 200 responses under the view
+name, a scope and the request's parameters. The scope function tells who
+shares an entry ("staff", "user:3") and which version counters it depends
+on ("all", "project:7", "user:3"). Writes bump those counters once their
+transaction commits (analytics/signals.py), which invalidates every entry
+that depends on them:
+
+    @api_view(["GET"])
+    @cached_endpoint("task_status_chart", scope=chart_scope, timeout=300)
+    def task_status_chart(request): ...
+
+Entries are fresh for their timeout, at most ENDPOINT_CACHE_TIMEOUTS[name]
+when set, and then kept ENDPOINT_CACHE_STALE_SECONDS longer. A stale or
+invalidated entry is still served while the one request holding the refresh
+lock recomputes it, so a write to a busy dashboard costs one recomputation
+instead of one per open dashboard. Data that changes without a write (the
+current day, the feed window) is only as fresh as the timeout.
+
+Results computed on a lagging replica may predate the versions they are
+stored with, so they are only fresh for REPLICA_STICKY_SECONDS.
+
+Version counters come from taskflow/version_counters.py, so a lost counter
+never brings back an old version.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from analytics.metrics import CACHE_REQUESTS
+from .db_router import reading_from_replica
+from . import version_counters
+
+VERSION_KEY = "endpoint_version:{name}"
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+# How long a crashed refresh can keep others from refreshing
+REFRESH_LOCK_TIMEOUT = 30
+
+
+def get_versions(names):
+    return version_counters.get_versions([VERSION_KEY.format(name=name) for name in names], VERSION_TIMEOUT)
+
+
+def bump_versions(*names):
+    """Invalidate the entries depending on these counters once the transaction commits"""
+    names = {name for name in names if name is not None}
+    if names:
+        transaction.on_commit(lambda: _bump(names))
+
+
+def _bump(names):
+    for name in names:
+        version_counters.bump_version(VERSION_KEY.format(name=name), VERSION_TIMEOUT)
+
+
+def get_timeout(name, default):
+    timeout = min(default, settings.ENDPOINT_CACHE_TIMEOUTS.get(name, default))
+    if reading_from_replica():
+        timeout = min(timeout, settings.REPLICA_STICKY_SECONDS)
+    return timeout
+
+
+def _entry_key(name, scope_key, request, kwargs):
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(repr((sorted(kwargs.items()), params)).encode()).hexdigest()
+    return f"endpoint:{name}:{scope_key}:{digest}"
+
+
+def _compute(view, request, args, kwargs, key, versions, timeout):
+    response = view(request, *args, **kwargs)
+    if response.status_code == 200:
+        cache.set(key, {
+            "versions": versions,
+            "data": response.data,
+            "fresh_until": time.time() + timeout,
+        }, timeout + settings.ENDPOINT_CACHE_STALE_SECONDS)
+    return response
+
+
+def cached_endpoint(name, scope, timeout=300):
+    """
+    Cache a DRF function view's response data. Goes below @api_view and the
+    permission decorators, so only authorized requests reach the cache; use
+    method_decorator on ViewSet actions.
+
+    `scope(request, **kwargs)` returns (scope_key, version names).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not settings.ENDPOINT_CACHE_ENABLED:
+                return view(request, *args, **kwargs)
+
+            scope_key, version_names = scope(request, **kwargs)
+            key = _entry_key(name, scope_key, request, kwargs)
+            versions = get_versions(version_names)
+            fresh_for = get_timeout(name, timeout)
+            metric = f"endpoint:{name}"
+
+            entry = cache.get(key)
+            if entry is None:
+                CACHE_REQUESTS.inc(cache=metric, result="miss")
+                return _compute(view, request, args, kwargs, key, versions, fresh_for)
+
+            if entry["versions"] == versions and time.time() < entry["fresh_until"]:
+                CACHE_REQUESTS.inc(cache=metric, result="hit")
+                return Response(entry["data"])
+
+            lock_key = f"{key}:refresh"
+            if not cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT):
+                # Another request is refreshing it
+                CACHE_REQUESTS.inc(cache=metric, result="stale")
+                return Response(entry["data"])
+
+            CACHE_REQUESTS.inc(cache=metric, result="refresh")
+            try:
+                return _compute(view, request, args, kwargs, key, versions, fresh_for)
+            finally:
+                cache.delete(lock_key)
+
+        return wrapped
+    return decorator
@@ -0,0 +1,52 @@
+"""
+Conditional GET support for API views.
+
+A view builds its ETag with `make_etag` from version data that is cheap to
+read (row timestamps, version counters kept in the cache), checks it with
+`not_modified` before doing any serializer work, and tags the full response
+with `with_etag`. Version data must be read no later than the data it
+describes: a change landing in between then costs the client one more full
+response instead of leaving it on stale data.
+
+Responses depend on the requesting user, so ETags include the user and
+responses are marked private and revalidated on every use.
+"""
+import hashlib
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .db_router import reading_from_replica
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(":".join(str(part) for part in parts).encode()).hexdigest())
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def not_modified(request, etag):
+    """A 304 response if the request's If-None-Match matches `etag`, else None"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return None
+
+    # If-None-Match uses weak comparison
+    tags = {_strip_weak(tag) for tag in parse_etags(header)}
+    if "*" not in tags and etag not in tags:
+        return None
+    return with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+
+def with_etag(response, etag):
+    # A lagging replica can serve data older than the version in the ETag,
+    # which would keep the client on it after the replica caught up
+    if not reading_from_replica():
+        response["ETag"] = etag
+    patch_vary_headers(response, ("Authorization", "Cookie"))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
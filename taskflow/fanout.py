@@ -0,0 +1,94 @@
+"""
+Run independent sub-queries of a single request concurrently.
+
+`fan_out` runs callables on a bounded, process-wide thread pool. Django keeps
+one connection per thread, so each callable queries over its own connection;
+`close_old_connections` around every call gives pool threads the same
+CONN_MAX_AGE lifecycle as request threads. `afan_out` runs `fan_out` for
+async views: the async ORM sends every query through thread sensitive
+sync_to_async, one after another on the same thread, so gathering several
+of its queries gains nothing.
+
+Both take a dict of name -> work and return a dict of name -> result. The
+first exception raised by any piece of work is re-raised to the caller.
+
+Fan-out only pays off when pool threads keep their connections. Without
+persistent (CONN_MAX_AGE) or pooled connections every call would open a new
+connection and run its setup again, such as the SQLite PRAGMAs, which costs
+more than the overlap saves; `fan_out` runs inline then. That includes the
+default SQLite setup, where CONN_MAX_AGE is 0.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.FANOUT_MAX_WORKERS,
+                    thread_name_prefix="fanout",
+                )
+    return _executor
+
+
+def _in_transaction():
+    # Other connections cannot see writes of an open transaction
+    return any(conn.in_atomic_block for conn in connections.all(initialized_only=True))
+
+
+def _reuses_connections():
+    # CONN_MAX_AGE None keeps connections forever
+    return all(
+        conn.settings_dict["CONN_MAX_AGE"] != 0 or "pool" in conn.settings_dict["OPTIONS"]
+        for conn in connections.all()
+    )
+
+
+def _run(func):
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+def fan_out(calls):
+    """
+    Run zero-argument callables concurrently, each on its own DB connection.
+
+    Falls back to running them inline when there is nothing to parallelise,
+    when FANOUT_MAX_WORKERS <= 1, inside a transaction, or when connections
+    are neither persistent nor pooled.
+    """
+    if (
+        len(calls) <= 1 or settings.FANOUT_MAX_WORKERS <= 1
+        or _in_transaction() or not _reuses_connections()
+    ):
+        return {name: func() for name, func in calls.items()}
+
+    executor = _get_executor()
+    # Copy the context per call so request-scoped ContextVars stay visible
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _run, func)
+        for name, func in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+async def afan_out(calls):
+    """
+    `fan_out` from async code. Thread sensitive, so the inline fallback runs
+    on the request's sync thread and connection like the rest of its queries.
+    """
+    return await sync_to_async(fan_out)(calls)
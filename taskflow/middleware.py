@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS
+
+from .db_router import get_replica_alias, mark_primary_sticky
+
+
+class DebugLatencyMiddleware:
+    """
+    Opt-in artificial latency for frontend development, e.g. to check loading
+    states. Reads DEBUG_LATENCY, a mapping of URL name -> seconds, and is
+    unused unless DEBUG is on and DEBUG_LATENCY is set. Sync and async, so it
+    never puts async views behind a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG or not settings.DEBUG_LATENCY:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        delay = self.get_delay(request)
+        if delay:
+            time.sleep(delay)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        delay = self.get_delay(request)
+        if delay:
+            await asyncio.sleep(delay)
+        return await self.get_response(request)
+
+    def get_delay(self, request):
+        # The view is not resolved yet at this point
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+        return settings.DEBUG_LATENCY.get(url_name)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pin clients to the primary database for a short while after they write,
+    so their next reads do not hit a lagging replica (see taskflow.db_router).
+    Unused unless a replica is configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if get_replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        if self.wrote(request, response):
+            mark_primary_sticky(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.wrote(request, response):
+            await sync_to_async(mark_primary_sticky)(request, response)
+        return response
+
+    def wrote(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
@@ -0,0 +1,311 @@
+"""
+Reproducible synthetic data sets for load and performance testing.
+
+Everything is generated from one seed (Faker plus random.Random), so the same
+arguments against an empty database produce the same rows. Rows are written
+with bulk_create in chunks and never held in memory all at once, which keeps
+the 1M task scale usable. bulk_create skips model signals, so no activity is
+logged for the generated rows other than the generated activity logs
+themselves.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from analytics.models import ActivityLog
+from analytics.task_counts import rebuild_task_daily_counts
+from projects.models import Project, ProjectMember
+from tasks.models import Task, TaskComment
+from users.models import User
+from users.utils.provisioning import apply_role_flags, assign_role_permissions
+from users.utils.user_directory import record_bulk_user_change
+
+# Ready made sizes, individual counts can still be overridden
+SCALES = {
+    "small": {"users": 50, "projects": 10, "tasks": 1_000},
+    "medium": {"users": 2_000, "projects": 200, "tasks": 100_000},
+    "large": {"users": 20_000, "projects": 2_000, "tasks": 1_000_000},
+}
+
+USER_ROLE_WEIGHTS = {"superadmin": 1, "staff": 9, "user": 90}
+MEMBER_ROLE_WEIGHTS = {"admin": 15, "member": 65, "viewer": 20}
+STATUS_WEIGHTS = {"todo": 30, "progress": 20, "done": 50}
+PRIORITY_WEIGHTS = {"low": 30, "medium": 50, "high": 20}
+ACTIVITY_WEIGHTS = {"create": 35, "status_change": 35, "assign": 15, "update": 15}
+
+# Share of tasks without an assignee, and of tasks outside any project
+UNASSIGNED_RATIO = 0.1
+NO_PROJECT_RATIO = 0.02
+
+# Project popularity follows a power law, so a few projects hold most tasks
+PROJECT_SKEW = 0.8
+
+DEFAULT_PASSWORD = "password"
+
+
+@contextmanager
+def backdated(*models):
+    """Let bulk_create keep explicit auto_now / auto_now_add timestamps"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _chooser(rng, weights):
+    choices = list(weights)
+    cum_weights = list(accumulate(weights.values()))
+    return lambda k=1: rng.choices(choices, cum_weights=cum_weights, k=k)
+
+
+def _name_offset(model):
+    # Numeric suffix that keeps unique names unique when seeding on top of existing data
+    return model.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+def _chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+class DataSeeder:
+    def __init__(
+        self, users, projects, tasks, comments_per_task=0.5, activities_per_task=2.0,
+        members_per_project=(3, 15), days=365, seed=0, chunk_size=5000,
+        password=DEFAULT_PASSWORD, log=None,
+    ):
+        self.counts = {"users": users, "projects": projects, "tasks": tasks}
+        self.comments_per_task = comments_per_task
+        self.activities_per_task = activities_per_task
+        self.members_per_project = members_per_project
+        self.days = days
+        self.chunk_size = chunk_size
+        self.password = password
+        self.log = log or (lambda message: None)
+
+        self.rng = random.Random(seed)
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+        # Midnight keeps timestamps identical for runs on the same day
+        self.now = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        self.usernames = {}
+        self.user_ids = []
+        # Staff and superadmins, who create the projects
+        self.creator_ids = []
+        self.project_ids = []
+        self.project_members = {}
+
+    def random_time(self, after=None):
+        start = after or self.now - timedelta(days=self.days)
+        span = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.rng.uniform(0, span))
+
+    def run(self):
+        with backdated(User, Project, ProjectMember, Task, TaskComment, ActivityLog):
+            self.create_users()
+            self.create_projects()
+            totals = self.create_tasks()
+        # bulk_create skipped the counter signals
+        rebuild_task_daily_counts()
+        return {"users": len(self.user_ids), "projects": len(self.project_ids), **totals}
+
+    def create_users(self):
+        password = make_password(self.password)
+        pick_role = _chooser(self.rng, USER_ROLE_WEIGHTS)
+        job_roles = [value for value, _ in User.JOB_ROLES]
+        offset = _name_offset(User)
+
+        for start, size in _chunks(self.counts["users"], self.chunk_size):
+            users = []
+            for i in range(start, start + size):
+                first_name, last_name = self.fake.first_name(), self.fake.last_name()
+                username = f"{first_name}.{last_name}{offset + i}".lower()
+                user = User(
+                    username=username,
+                    email=f"{username}@{self.fake.free_email_domain()}",
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password,
+                    # Every data set gets at least one superadmin
+                    role="superadmin" if i == 0 else pick_role()[0],
+                    job_role=self.rng.choice(job_roles),
+                    department=self.fake.bs().split()[-1].title(),
+                    designation=self.fake.job()[:100],
+                    date_joined=self.random_time(),
+                )
+                user.date_of_joining = user.date_joined.date()
+                apply_role_flags(user)
+                users.append(user)
+
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                assign_role_permissions(users)
+            for user in users:
+                self.usernames[user.pk] = user.username
+                self.user_ids.append(user.pk)
+                if user.role != "user":
+                    self.creator_ids.append(user.pk)
+            self.log(f"Created {start + size} users")
+
+        record_bulk_user_change()
+
+    def create_projects(self):
+        pick_member_role = _chooser(self.rng, MEMBER_ROLE_WEIGHTS)
+        offset = _name_offset(Project)
+        creators = self.creator_ids or self.user_ids
+
+        for start, size in _chunks(self.counts["projects"], self.chunk_size):
+            projects = []
+            for i in range(start, start + size):
+                created_at = self.random_time()
+                projects.append(Project(
+                    name=f"{self.fake.company()} {self.fake.word().title()} {offset + i + 1}"[:100],
+                    description=self.fake.paragraph(),
+                    created_by_id=self.rng.choice(creators),
+                    created_at=created_at,
+                    updated_at=self.random_time(after=created_at),
+                ))
+
+            memberships = []
+            with transaction.atomic():
+                for project in Project.objects.bulk_create(projects):
+                    members = {project.created_by_id: "owner"}
+                    member_count = min(self.rng.randint(*self.members_per_project), len(self.user_ids))
+                    for user_id in self.rng.sample(self.user_ids, member_count):
+                        members.setdefault(user_id, pick_member_role()[0])
+                    memberships.extend(
+                        ProjectMember(
+                            project_id=project.pk, user_id=user_id, role=role,
+                            joined_at=self.random_time(after=project.created_at),
+                        )
+                        for user_id, role in members.items()
+                    )
+                    self.project_ids.append(project.pk)
+                    # Viewers are never assigned tasks
+                    self.project_members[project.pk] = [
+                        user_id for user_id, role in members.items() if role != "viewer"
+                    ]
+                ProjectMember.objects.bulk_create(memberships, batch_size=self.chunk_size)
+            self.log(f"Created {start + size} projects")
+
+    def create_tasks(self):
+        pick_status = _chooser(self.rng, STATUS_WEIGHTS)
+        pick_priority = _chooser(self.rng, PRIORITY_WEIGHTS)
+        project_weights = list(accumulate(1 / (rank + 1) ** PROJECT_SKEW for rank in range(len(self.project_ids))))
+        totals = {"tasks": 0, "comments": 0, "activity_logs": 0}
+        offset = _name_offset(Task)
+
+        for start, size in _chunks(self.counts["tasks"], self.chunk_size):
+            tasks = []
+            for i in range(start, start + size):
+                project_id = None
+                if self.project_ids and self.rng.random() >= NO_PROJECT_RATIO:
+                    project_id = self.rng.choices(self.project_ids, cum_weights=project_weights)[0]
+
+                user_id = None
+                if self.rng.random() >= UNASSIGNED_RATIO:
+                    candidates = self.project_members.get(project_id) or self.user_ids
+                    user_id = self.rng.choice(candidates)
+
+                created_at = self.random_time()
+                tasks.append(Task(
+                    name=f"{self.fake.catch_phrase()} #{offset + i + 1}"[:100],
+                    description=self.fake.paragraph() if self.rng.random() < 0.7 else None,
+                    user_id=user_id,
+                    project_id=project_id,
+                    status=pick_status()[0],
+                    priority=pick_priority()[0],
+                    created_at=created_at,
+                    updated_at=self.random_time(after=created_at),
+                    due_date=(created_at + timedelta(days=self.rng.randint(1, 60))).date()
+                    if self.rng.random() < 0.6 else None,
+                ))
+
+            with transaction.atomic():
+                tasks = Task.objects.bulk_create(tasks)
+                comments = TaskComment.objects.bulk_create(self.build_comments(tasks))
+                activities = ActivityLog.objects.bulk_create(self.build_activities(tasks, comments))
+
+            totals["tasks"] += len(tasks)
+            totals["comments"] += len(comments)
+            totals["activity_logs"] += len(activities)
+            self.log(f"Created {totals['tasks']} tasks")
+        return totals
+
+    def _sample_count(self, population, ratio):
+        # Integer part always, fractional part as a probability
+        count = int(population * ratio)
+        return count + (self.rng.random() < population * ratio - count)
+
+    def build_comments(self, tasks):
+        comments = []
+        for _ in range(self._sample_count(len(tasks), self.comments_per_task)):
+            task = self.rng.choice(tasks)
+            candidates = self.project_members.get(task.project_id) or self.user_ids
+            comments.append(TaskComment(
+                task_id=task.pk,
+                user_id=self.rng.choice(candidates),
+                comment=self.fake.sentence(nb_words=self.rng.randint(4, 30)),
+                created_at=self.random_time(after=task.created_at),
+            ))
+        return comments
+
+    def build_activities(self, tasks, comments):
+        pick_action = _chooser(self.rng, ACTIVITY_WEIGHTS)
+        tasks_by_id = {task.pk: task for task in tasks}
+        statuses = list(STATUS_WEIGHTS)
+        activities = []
+
+        # Every comment on a project task is logged, the rest are spread over tasks
+        for comment in comments:
+            task = tasks_by_id[comment.task_id]
+            if task.project_id:
+                preview = comment.comment[:50] + '...' if len(comment.comment) > 50 else comment.comment
+                activities.append(ActivityLog(
+                    user_id=comment.user_id, project_id=task.project_id, task_id=task.pk,
+                    action="comment", description=f'Commented on "{task.name}": {preview}',
+                    metadata={"comment_id": comment.pk}, created_at=comment.created_at,
+                ))
+
+        project_tasks = [task for task in tasks if task.project_id]
+        remaining = self._sample_count(len(tasks), self.activities_per_task) - len(activities)
+        for _ in range(max(remaining, 0) if project_tasks else 0):
+            task = self.rng.choice(project_tasks)
+            actor_id = self.rng.choice(self.project_members.get(task.project_id) or self.user_ids)
+            action = pick_action()[0]
+            if action == "create":
+                description = f'Created task "{task.name}"'
+                metadata = {"task_id": task.pk, "status": task.status, "priority": task.priority}
+            elif action == "status_change":
+                old_status, new_status = self.rng.sample(statuses, 2)
+                description = f'Changed status of "{task.name}" from {old_status} to {new_status}'
+                metadata = {"old_status": old_status, "new_status": new_status}
+            elif action == "assign" and task.user_id:
+                description = f'Assigned task "{task.name}" to {self.usernames.get(task.user_id, task.user_id)}'
+                metadata = {"assignee_id": task.user_id, "previous_assignee_id": None}
+            else:
+                action = "update"
+                description = f'Updated task "{task.name}": priority: medium → {task.priority}'
+                metadata = {"changes": {"priority": ["medium", task.priority]}}
+
+            activities.append(ActivityLog(
+                user_id=actor_id, project_id=task.project_id, task_id=task.pk,
+                action=action, description=description, metadata=metadata,
+                created_at=self.random_time(after=task.created_at),
+            ))
+        return activities
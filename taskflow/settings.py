@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 
+from .database import build_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +30,32 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Artificial delay per URL name, only applied when DEBUG is on. Useful to
+# check loading states in the frontend, e.g. {"user_create": 1}
+DEBUG_LATENCY = {}
+
+# Per-request profiling (Server-Timing header plus a JSON log line per request).
+# PROFILING_CPROFILE_RATE is the fraction of requests also run under cProfile.
+PROFILING_ENABLED = False
+PROFILING_CPROFILE_RATE = 0.0
+PROFILING_CPROFILE_TOP = 20
+
+# Metrics served at /metrics. With several worker processes, point
+# METRICS_MULTIPROC_DIR at a directory they share so the numbers are summed.
+METRICS_ENABLED = True
+METRICS_MULTIPROC_DIR = None
+METRICS_WRITE_INTERVAL = 5
+# Scrapers must send "Authorization: Bearer <token>". Without a token /metrics
+# only answers while DEBUG is on.
+METRICS_TOKEN = None
+
+# Queries slower than this are logged with their call site and query plan,
+# and listed at /api/analytics/slow-queries/. None turns the slow query log off.
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_TOP_N = 50
+SLOW_QUERY_STACK_DEPTH = 8
+
 CORS_ALLOW_ALL_ORIGINS = False
 
 CORS_ALLOWED_ORIGINS = [
@@ -63,6 +91,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'analytics.middleware.ProfilingMiddleware',
+    'analytics.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,6 +103,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'analytics.middleware.ActivityLogMiddleware',
+    'taskflow.middleware.ReplicaStickinessMiddleware',
+    'taskflow.middleware.DebugLatencyMiddleware',
 ]
 
 ROOT_URLCONF = 'taskflow.urls'
@@ -97,12 +130,22 @@ WSGI_APPLICATION = 'taskflow.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# Configured from DATABASE_URL / DATABASE_REPLICA_URL and friends, see
+# taskflow/database.py. Defaults to db.sqlite3 in WAL mode.
+DATABASES = build_databases(BASE_DIR)
+
+# Safe requests to views decorated with taskflow.db_router.use_replica read
+# from the `replica` database. Clients stay on the primary for this many
+# seconds after their own writes, so they never read a lagging replica.
+DATABASE_ROUTERS = ["taskflow.db_router.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = "db_sticky"
+
+
+# Threads used to run independent sub-queries of one request concurrently,
+# each on its own connection (see taskflow.fanout). 1 disables the fan-out; it
+# also runs inline unless connections are persistent (CONN_MAX_AGE) or pooled.
+FANOUT_MAX_WORKERS = 4
 
 
 # Password validation
@@ -150,6 +193,8 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
+        # Swap for "users.authentication.CachedUserJWTAuthentication" to resolve
+        # the user from a cached snapshot instead of a SELECT per request
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
@@ -182,16 +227,80 @@ SIMPLE_JWT = {
     "AUTH_COOKIE_SAMESITE": "Lax",
 }
 
+# Cached user snapshots used by CachedUserJWTAuthentication
+USER_SNAPSHOT_CACHE_TIMEOUT = 60 * 5
+USER_SNAPSHOT_LOCAL_TTL = 30
+USER_SNAPSHOT_LOCAL_SIZE = 2048
+
+# Redis behind a per-process tier for the hottest keys, with stampede
+# protection for get_or_set (taskflow/tiered_cache.py). LOCAL_KEYS may be up
+# to LOCAL_TTL seconds stale in other processes. While Redis is unreachable a
+# circuit breaker sends calls to a local-memory fallback.
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        "BACKEND": "taskflow.tiered_cache.TieredCache",
         "LOCATION": "redis://127.0.0.1:6379/1",
         "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "REMOTE_BACKEND": "django_redis.cache.RedisCache",
+            "REMOTE_OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                # Fail fast, the circuit breaker takes it from there
+                "SOCKET_CONNECT_TIMEOUT": 0.25,
+                "SOCKET_TIMEOUT": 0.5,
+            },
+            "LOCAL_KEYS": ["task_search_version", "endpoint_version:"],
+            "LOCAL_TTL": 5,
+            "CIRCUIT_FAILURE_THRESHOLD": 3,
+            "CIRCUIT_BACKOFF": 1.0,
+            "CIRCUIT_MAX_BACKOFF": 60.0,
         }
     }
 }
 
+# Delta sync (/api/tasks/changes/). Changes are only returned once they are
+# TASK_CHANGES_SETTLE_SECONDS old, so transactions still in flight cannot
+# commit behind a client's cursor. Tombstones of deleted tasks are kept for
+# TASK_TOMBSTONE_RETENTION_DAYS (`manage.py purge_task_tombstones`); older
+# cursors get a 410 and the client syncs from scratch.
+TASK_CHANGES_SETTLE_SECONDS = 2
+TASK_TOMBSTONE_RETENTION_DAYS = 30
+
+# Live activity feed: an SSE stream under ASGI, a long-poll under WSGI. Under
+# WSGI every waiting client holds a worker thread, so run a threaded worker.
+# Switch the broker to analytics.live.RedisBroker when running more than one
+# process, so activities logged by one reach the listeners of the others.
+ACTIVITY_LIVE_BROKER = "analytics.live.LocalBroker"
+ACTIVITY_LIVE_REDIS_URL = "redis://127.0.0.1:6379/1"
+ACTIVITY_LIVE_REDIS_CHANNEL = "taskflow:activities"
+ACTIVITY_LIVE_POLL_TIMEOUT = 25
+ACTIVITY_LIVE_HEARTBEAT_SECONDS = 15
+ACTIVITY_LIVE_STREAM_SECONDS = 300
+
+# Cached analytics responses (taskflow/endpoint_cache.py). Writes invalidate
+# them through version counters; ENDPOINT_CACHE_TIMEOUTS caps how long an
+# endpoint's results stay fresh, e.g. {"task_status_chart": 60}. Past that
+# they are served for ENDPOINT_CACHE_STALE_SECONDS more while one request
+# recomputes them.
+ENDPOINT_CACHE_ENABLED = True
+ENDPOINT_CACHE_TIMEOUTS = {}
+ENDPOINT_CACHE_STALE_SECONDS = 30
+
+# Local days the weekly chart can be bucketed in (`?tz=`), TIME_ZONE by default.
+# Tasks are counted once per entry, see analytics/task_counts.py. Run
+# `manage.py rebuild_task_daily_counts` after changing the list.
+TASK_CHART_TIMEZONES = [TIME_ZONE]
+
+# Activity log retention
+# Rows older than the retention window are moved to gzipped NDJSON files by
+# `manage.py archive_activity_logs`. Projects can override the window through
+# `analytics.ActivityRetentionPolicy`.
+ACTIVITY_LOG_RETENTION_DAYS = 180
+ACTIVITY_LOG_ARCHIVE_DIR = BASE_DIR / "archive" / "activity_logs"
+ACTIVITY_LOG_ARCHIVE_BATCH_SIZE = 1000
+
+# Activity feeds only look this far back unless `date_from` is given
+ACTIVITY_LOG_FEED_WINDOW_DAYS = 30
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -239,5 +348,11 @@ LOGGING = {
             "level": "DEBUG",
             "propagate": False,
         },
+
+        "taskflow": {
+            "handlers": ["console", "file"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
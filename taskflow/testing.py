@@ -0,0 +1,200 @@
+"""
+Shared helpers for the query-count test suites in each app's tests.py.
+
+QueryCountTestCase builds one small data set per test class and pins the
+number of SQL queries an endpoint issues. Listing endpoints are checked at
+several page sizes with one expected count, so a query per row fails the
+test instead of slipping through as a slower page.
+
+STUB_REDIS_CACHES swaps Redis for StubRedisCache, which can be taken down
+mid-test to exercise the cache fallback.
+"""
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APIClient, APITestCase
+
+from analytics.models import ActivityLog
+from projects.models import Project, ProjectMember
+from tasks.models import Task, TaskComment
+from users.models import User
+from users.utils.provisioning import clear_role_permission_cache
+from users.utils.user_directory import reset_user_directory
+from users.utils.user_snapshot import clear_local_user_snapshots
+
+PAGE_SIZES = (1, 50)
+
+# Enough rows to fill the largest page
+FIXTURE_ROWS = 60
+
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# The production cache layout, with a Redis stand-in that tests can take down
+STUB_REDIS_CACHES = {"default": {
+    "BACKEND": "taskflow.tiered_cache.TieredCache",
+    "LOCATION": "stub-redis",
+    "OPTIONS": {
+        "REMOTE_BACKEND": "taskflow.testing.StubRedisCache",
+        "LOCAL_KEYS": ["task_search_version", "endpoint_version:"],
+        "CIRCUIT_FAILURE_THRESHOLD": 2,
+    },
+}}
+
+
+class StubRedisCache(LocMemCache):
+    """Local-memory cache that fails like an unreachable Redis while `down` is set"""
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.down = False
+        self.calls = 0
+
+    def _connect(self):
+        self.calls += 1
+        if self.down:
+            raise RedisConnectionError("stub redis is down")
+
+    def get(self, *args, **kwargs):
+        self._connect()
+        return super().get(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        self._connect()
+        return super().set(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        self._connect()
+        return super().add(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self._connect()
+        return super().delete(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        self._connect()
+        return super().incr(*args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        self._connect()
+        return super().touch(*args, **kwargs)
+
+    def has_key(self, *args, **kwargs):
+        self._connect()
+        return super().has_key(*args, **kwargs)
+
+    def clear(self):
+        self._connect()
+        return super().clear()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryCountTestCase(APITestCase):
+    """
+    Fixture: a superadmin, a staff user who owns two projects, and `member`,
+    an admin of the first project and a plain member of the second, with
+    FIXTURE_ROWS tasks, comments and activity logs of their own.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create(username="superadmin", role="superadmin")
+        cls.staff = User.objects.create(username="staff", role="staff", is_staff=True)
+        cls.member = User.objects.create(username="member", role="user", first_name="Mem", last_name="Ber")
+        cls.outsider = User.objects.create(username="outsider", role="user")
+
+        cls.project = Project.objects.create(name="Apollo", created_by=cls.staff)
+        cls.other_project = Project.objects.create(name="Gemini", created_by=cls.staff)
+        ProjectMember.objects.bulk_create([
+            ProjectMember(project=cls.project, user=cls.staff, role="owner"),
+            ProjectMember(project=cls.other_project, user=cls.staff, role="owner"),
+            ProjectMember(project=cls.project, user=cls.member, role="admin"),
+            ProjectMember(project=cls.other_project, user=cls.member, role="member"),
+            ProjectMember(project=cls.other_project, user=cls.outsider, role="viewer"),
+        ])
+
+        cls.tasks = Task.objects.bulk_create([
+            Task(
+                name=f"Task {i}",
+                user=cls.member,
+                project=cls.project if i % 2 else cls.other_project,
+                status=["todo", "progress", "done"][i % 3],
+            )
+            for i in range(FIXTURE_ROWS)
+        ])
+        cls.task = cls.tasks[0]
+        TaskComment.objects.bulk_create([
+            TaskComment(task=cls.task, user=cls.member, comment=f"Comment {i}")
+            for i in range(FIXTURE_ROWS)
+        ])
+        ActivityLog.objects.bulk_create([
+            ActivityLog(
+                user=cls.member, project=cls.project, task=task,
+                action="comment" if i == 0 else "create", description=f'Created task "{task.name}"',
+            )
+            for i, task in enumerate(cls.tasks)
+        ])
+
+    def setUp(self):
+        # Process-wide caches outlive test transactions
+        cache.clear()
+        reset_user_directory()
+        clear_local_user_snapshots()
+        clear_role_permission_cache()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def assertQueryCount(self, expected, user, *paths, using=DEFAULT_DB_ALIAS):
+        """
+        GET every path as `user` and assert each one issues exactly `expected`
+        queries. Each path is requested once beforehand so process-level
+        caches are warm and only the steady state is counted.
+        """
+        client = self.client_for(user)
+        for path in paths:
+            warmup = client.get(path)
+            self.assertEqual(warmup.status_code, 200, f"GET {path}: {warmup.status_code}")
+
+            with CaptureQueriesContext(connections[using]) as context:
+                response = client.get(path)
+            self.assertEqual(response.status_code, 200, f"GET {path}: {response.status_code}")
+
+            queries = "\n".join(f"  {query['sql']}" for query in context.captured_queries)
+            self.assertEqual(
+                len(context), expected,
+                f"GET {path} issued {len(context)} queries, expected {expected}:\n{queries}",
+            )
+
+    def assertPageQueryCount(self, expected, user, path, page_sizes=PAGE_SIZES, param="page_size"):
+        """assertQueryCount for the same listing at each page size"""
+        separator = "&" if "?" in path else "?"
+        self.assertQueryCount(
+            expected, user,
+            *[f"{path}{separator}{param}={page_size}" for page_size in page_sizes],
+        )
+
+    def assertNotModified(self, expected, user, path):
+        """
+        GET `path` as `user`, then repeat it with the returned ETag and assert
+        a 304 after `expected` queries. Returns the ETag.
+        """
+        client = self.client_for(user)
+        response = client.get(path)
+        self.assertEqual(response.status_code, 200, f"GET {path}: {response.status_code}")
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+            response = client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304, f"GET {path} with If-None-Match: {response.status_code}")
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(len(context), expected, f"304 for {path} issued {len(context)} queries")
+        return etag
+
+    def assertModified(self, user, path, etag):
+        response = self.client_for(user).get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200, f"GET {path} with a stale ETag: {response.status_code}")
@@ -0,0 +1,312 @@
+"""
+Two-tier cache backend: a per-process LRU in front of a shared cache.
+
+Keys starting with one of OPTIONS["LOCAL_KEYS"] are also kept in a
+LocalTTLCache for at most OPTIONS["LOCAL_TTL"] seconds, so hot values read on
+every request (version counters, small maps) usually cost no round trip.
+Writes through this process update the local copy right away; writes from
+other processes become visible when it expires.
+
+`get_or_set` with a callable default protects expensive values from cache
+stampedes. Only the process holding a short lock recomputes a missing value
+while the others wait for it, and values are recomputed shortly before they
+expire with a probability that grows with how long they took to compute
+("XFetch", Vattani et al.), so popular keys rarely expire at all.
+
+If the shared cache is unreachable, calls fall back to a local-memory cache
+instead of failing the request. After CIRCUIT_FAILURE_THRESHOLD failures in a
+row a circuit breaker stops trying it at all, so an outage costs one short
+socket timeout now and then rather than one per call. It lets a single call
+through again after a backoff that doubles with every failed retry, up to
+CIRCUIT_MAX_BACKOFF seconds. Its state is logged and exported through
+analytics.metrics.
+
+    CACHES = {"default": {
+        "BACKEND": "taskflow.tiered_cache.TieredCache",
+        "LOCATION": "redis://127.0.0.1:6379/1",
+        "OPTIONS": {
+            "REMOTE_BACKEND": "django_redis.cache.RedisCache",
+            "REMOTE_OPTIONS": {...},
+            "LOCAL_KEYS": ["task_search_version"],
+        },
+    }}
+"""
+import logging
+import math
+import random
+import threading
+import time
+from collections import namedtuple
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+from analytics import metrics
+from .local_cache import LocalTTLCache
+
+logger = logging.getLogger("taskflow")
+
+try:
+    from django_redis.exceptions import ConnectionInterrupted
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    REMOTE_ERRORS = (ConnectionInterrupted, RedisConnectionError, RedisTimeoutError, OSError)
+except ImportError:  # pragma: no cover
+    REMOTE_ERRORS = (OSError,)
+
+_MISSING = object()
+
+# What get_or_set stores for callable defaults: the value, how long it took to
+# compute and when it expires (None for never)
+Stamped = namedtuple("Stamped", ["value", "delta", "expires_at"])
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, Stamped) else value
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through. open: calls are refused until the backoff has
+    passed. half_open: one trial call is in flight, its outcome closes the
+    circuit or opens it again with twice the backoff.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=3, backoff=1.0, max_backoff=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.retries = 0
+        self.retry_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() >= self.retry_at:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.CLOSED and not self.failures:
+                return
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            self.retries = 0
+        if recovered:
+            logger.info("cache circuit closed, shared cache is back")
+            metrics.CACHE_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures < self.failure_threshold:
+                return
+            # Jitter keeps processes from retrying in lockstep
+            delay = min(self.backoff * 2 ** self.retries, self.max_backoff) * random.uniform(0.8, 1.2)
+            self.retries += 1
+            self.state = self.OPEN
+            self.retry_at = self.clock() + delay
+        logger.warning("cache circuit open after %d failures, retrying in %.1fs", self.failures, delay)
+        metrics.CACHE_CIRCUIT_OPEN.set(1)
+        metrics.CACHE_CIRCUIT_OPENED.inc()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        shared = {key: value for key, value in params.items() if key not in ("BACKEND", "OPTIONS")}
+
+        self.remote = import_string(options.get("REMOTE_BACKEND", "django_redis.cache.RedisCache"))(
+            location, {**shared, "OPTIONS": options.get("REMOTE_OPTIONS", {})},
+        )
+        self.fallback = LocMemCache(f"tiered-fallback:{location}", shared)
+        self.local = LocalTTLCache(
+            maxsize=options.get("LOCAL_MAXSIZE", 1024), ttl=options.get("LOCAL_TTL", 5),
+        )
+        self.local_keys = tuple(options.get("LOCAL_KEYS", ()))
+        self.lock_timeout = options.get("LOCK_TIMEOUT", 10)
+        self.lock_wait = options.get("LOCK_WAIT", 2.0)
+        self.early_recompute_beta = options.get("EARLY_RECOMPUTE_BETA", 1.0)
+        self.breaker = CircuitBreaker(
+            failure_threshold=options.get("CIRCUIT_FAILURE_THRESHOLD", 3),
+            backoff=options.get("CIRCUIT_BACKOFF", 1.0),
+            max_backoff=options.get("CIRCUIT_MAX_BACKOFF", 60.0),
+        )
+
+    # Shared tier
+
+    def _remote(self, method, *args, **kwargs):
+        if self.breaker.allow():
+            try:
+                result = getattr(self.remote, method)(*args, **kwargs)
+            except REMOTE_ERRORS as exc:
+                self.breaker.record_failure()
+                logger.debug("cache %s failed, using the local fallback: %s", method, exc)
+            except Exception:
+                # e.g. incr of a missing key, the shared cache did answer
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+        metrics.CACHE_FALLBACKS.inc(operation=method)
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    # Local tier
+
+    def _is_local(self, key):
+        return key.startswith(self.local_keys) if self.local_keys else False
+
+    def _local_key(self, key, version):
+        return self.make_key(key, version)
+
+    def _remember(self, key, value, timeout, version):
+        if not self._is_local(key):
+            return
+        ttl = self.local.ttl
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        self.local.set(self._local_key(key, version), value, ttl)
+
+    def _forget(self, key, version):
+        if self._is_local(key):
+            self.local.delete(self._local_key(key, version))
+
+    def _get_raw(self, key, version=None):
+        if self._is_local(key):
+            value = self.local.get(self._local_key(key, version), _MISSING)
+            if value is not _MISSING:
+                return value
+
+        value = self._remote("get", key, _MISSING, version=version)
+        if value is not _MISSING:
+            self._remember(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        value = self._get_raw(key, version)
+        return default if value is _MISSING else _unwrap(value)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote_keys = []
+        for key in keys:
+            value = self.local.get(self._local_key(key, version), _MISSING) if self._is_local(key) else _MISSING
+            if value is _MISSING:
+                remote_keys.append(key)
+            else:
+                found[key] = value
+        if remote_keys:
+            for key, value in self._remote("get_many", remote_keys, version=version).items():
+                self._remember(key, value, DEFAULT_TIMEOUT, version)
+                found[key] = value
+        return {key: _unwrap(value) for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._remote("set", key, value, timeout, version=version)
+        self._remember(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._remote("set_many", data, timeout, version=version)
+        for key, value in data.items():
+            self._remember(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._remote("add", key, value, timeout, version=version)
+        if added:
+            self._remember(key, value, timeout, version)
+        else:
+            self._forget(key, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._remote("touch", key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        return self._remote("delete", key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._forget(key, version)
+        return self._remote("delete_many", keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self._get_raw(key, version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        value = self._remote("incr", key, delta, version=version)
+        self._remember(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def clear(self):
+        self.local.clear()
+        self.fallback.clear()
+        return self._remote("clear")
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        if not callable(default):
+            return super().get_or_set(key, default, timeout, version=version)
+
+        stamped = self._get_raw(key, version)
+        if stamped is not _MISSING:
+            if not self._should_recompute_early(stamped) or not self._lock(key, version):
+                return _unwrap(stamped)
+            return self._compute_and_set(key, default, timeout, version)
+
+        if self._lock(key, version):
+            return self._compute_and_set(key, default, timeout, version)
+
+        # Someone else is computing it, wait for their value rather than
+        # adding to the load that made it expensive
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            stamped = self._get_raw(key, version)
+            if stamped is not _MISSING:
+                return _unwrap(stamped)
+        return self._compute_and_set(key, default, timeout, version, locked=False)
+
+    # Stampede protection
+
+    def _lock_key(self, key):
+        return f"{key}:lock"
+
+    def _lock(self, key, version):
+        return self._remote("add", self._lock_key(key), 1, self.lock_timeout, version=version)
+
+    def _compute_and_set(self, key, default, timeout, version, locked=True):
+        try:
+            start = time.monotonic()
+            value = default()
+            delta = time.monotonic() - start
+            self.set(key, Stamped(value, delta, self.get_backend_timeout(timeout)), timeout, version=version)
+            return value
+        finally:
+            if locked:
+                self._remote("delete", self._lock_key(key), version=version)
+
+    def _should_recompute_early(self, stamped):
+        if not isinstance(stamped, Stamped) or stamped.expires_at is None:
+            return False
+        # -log(random()) is exponentially distributed, so recomputation gets
+        # likelier as expiry nears and slow values start earlier
+        gap = stamped.delta * self.early_recompute_beta * -math.log(1.0 - random.random())
+        return time.time() + gap >= stamped.expires_at
@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from analytics.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -23,4 +24,5 @@ urlpatterns = [
     path('api/tasks/', include('tasks.urls')),
     path('api/projects/', include('projects.urls')),
     path('api/analytics/', include('analytics.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,47 @@
+"""
+Version counters kept in the cache.
+
+A counter stands for the current state of some data: readers fold it into
+cache keys or ETags, writers bump it to invalidate them. Used by project
+versions (projects/utils/versioning.py), endpoint cache versions
+(taskflow/endpoint_cache.py) and the task search cache.
+
+Counters start from the current time in milliseconds rather than 1, so a
+counter lost to eviction or a cache flush never reissues a version, and an
+ETag or cache entry that may still exist. Bumps use add/incr, which are
+atomic; a read-modify-write could hand out a used version again.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _initial_version():
+    return time.time_ns() // 1_000_000
+
+
+def get_version(key, timeout):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(keys, timeout):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key, timeout):
+    if cache.add(key, _initial_version(), timeout):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, _initial_version(), timeout)
@@ -0,0 +1,43 @@
+"""
+Async (ASGI) versions of the read-heavy task endpoints.
+Response bodies match CreateListTaskView.get.
+"""
+from asgiref.sync import sync_to_async
+
+from projects.permissions_constant.permission_utils import aget_project_roles, build_permissions_map
+from taskflow.async_utils import AsyncPage, async_api_view, json_response
+from tasks.utils.pagination import TaskPagination
+from tasks.utils.task_filters import apply_task_filters, get_base_tasks_queryset
+from .serializers import TaskSerializer
+
+
+@async_api_view
+async def task_list(request):
+    """
+    List tasks visible to the user with the same filters, search and
+    pagination as `GET /api/tasks/`.
+    """
+    user = request.user
+    tasks = get_base_tasks_queryset(user)
+
+    # Fuzzy search reads the cache and scores candidates synchronously
+    tasks = await sync_to_async(apply_task_filters)(tasks, request.GET)
+    tasks = tasks.select_related("user", "project").order_by("-id")
+
+    paginator = AsyncPage(request, TaskPagination.page_size, TaskPagination.max_page_size)
+    page = await paginator.paginate(tasks)
+
+    project_ids = {task.project_id for task in page if task.project_id}
+    project_roles = await aget_project_roles(user, project_ids)
+    serializer = TaskSerializer(page, many=True, context={
+        "request": request,
+        "project_permissions": build_permissions_map(user, project_ids, project_roles),
+    })
+
+    return json_response(paginator.get_paginated_data({
+        "message": "Tasks fetched successfully",
+        "tasks": serializer.data,
+        "page_size": paginator.page_size,
+        "current_page": paginator.number,
+        "total_pages": paginator.num_pages,
+    }))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.models import TaskTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete task tombstones older than TASK_TOMBSTONE_RETENTION_DAYS. Delta sync "
+        "cursors older than that already have to sync from scratch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Defaults to TASK_TOMBSTONE_RETENTION_DAYS")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the tombstones that would be deleted")
+
+    def handle(self, *args, **options):
+        days = options["days"] or settings.TASK_TOMBSTONE_RETENTION_DAYS
+        tombstones = TaskTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days))
+
+        if options["dry_run"]:
+            self.stdout.write(f"{tombstones.count()} task tombstones would be deleted")
+            return
+
+        deleted, _ = tombstones.delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} task tombstones"))
@@ -30,10 +30,34 @@ class Task(models.Model):
     
     class Meta:
         ordering = ['-id']
+        indexes = [
+            # Keyset order of the delta sync endpoint
+            models.Index(fields=['updated_at', 'id']),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (project_id, user_id, created_at) as last loaded or saved, None for
+        # tasks loaded without these fields. The post_save receivers of delta
+        # sync, project versions and the task counters all compare against
+        # it, whatever their order.
+        self._loaded = self._loaded_fields()
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Only once every post_save receiver has seen the previous one
+        self._loaded = self._loaded_fields()
+
+    def _loaded_fields(self):
+        # Read from __dict__, so deferred fields are not fetched
+        loaded = self.__dict__
+        if {"project_id", "user_id", "created_at"} <= loaded.keys():
+            return (self.project_id, self.user_id, self.created_at)
+        return None
+
 class TaskComment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="comments")
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
@@ -44,6 +68,28 @@ class TaskComment(models.Model):
         return f"Comment by {self.user} on {self.task}"
 
 
+class TaskTombstone(models.Model):
+    """
+    A deleted task, for clients syncing through /api/tasks/changes/.
+    Plain ids rather than foreign keys: the task is gone, and its user or
+    project may be deleted along with it.
+    """
+    task_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    project_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id']),
+            models.Index(fields=['user_id', 'deleted_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} deleted at {self.deleted_at}"
+
+
 # class TaskAttachment(models.Model):
 #     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
 #     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
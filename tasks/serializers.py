@@ -18,6 +18,11 @@ class ProjectSerializer(ModelSerializer):
         request = self.context.get("request")
         if not request:
             return {}
+
+        # Precomputed by list views to avoid a membership query per task
+        permissions_map = self.context.get("project_permissions")
+        if permissions_map is not None and obj.id in permissions_map:
+            return permissions_map[obj.id]
         return get_user_permissions(user=request.user, project=obj)
 
 class TaskSerializer(ModelSerializer):
@@ -1,3 +1,299 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache as default_cache
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from analytics import metrics
+from analytics.signals import task_reassigned_post_save
+from projects.models import Project
+from projects.utils.versioning import get_project_version
+from taskflow.testing import STUB_REDIS_CACHES, QueryCountTestCase
+from taskflow.tiered_cache import CircuitBreaker, Stamped, TieredCache
+from tasks.models import Task, TaskTombstone
+from tasks.utils.task_changes import decode_cursor, encode_cursor
+
+
+class TaskQueryCountTests(QueryCountTestCase):
+    def test_task_list(self):
+        # count, page with users and projects joined, memberships of the page's projects
+        for user in (self.superadmin, self.staff, self.member):
+            self.assertPageQueryCount(3, user, "/api/tasks/")
+
+    def test_task_search(self):
+        # Search results are cached after the warmup request
+        self.assertPageQueryCount(3, self.member, "/api/tasks/?search=task")
+
+    def test_task_search_is_scoped(self):
+        # Cached results of a broader search must not leak into a narrower one
+        response = self.client_for(self.superadmin).get("/api/tasks/?search=task")
+        self.assertEqual(response.json()["count"], len(self.tasks))
+        response = self.client_for(self.outsider).get("/api/tasks/?search=task")
+        self.assertEqual(response.json()["count"], 0)
+        response = self.client_for(self.superadmin).get("/api/tasks/?search=task&status=done")
+        self.assertEqual(response.json()["count"], len(self.tasks) // 3)
+
+    def test_task_detail(self):
+        # The task's project and timestamp for the ETag, then the task
+        self.assertQueryCount(2, self.superadmin, f"/api/tasks/{self.task.pk}/")
+        # plus the member's role in the task's project
+        self.assertQueryCount(3, self.member, f"/api/tasks/{self.task.pk}/")
+
+    def test_task_detail_not_modified(self):
+        path = f"/api/tasks/{self.task.pk}/"
+        etag = self.assertNotModified(1, self.member, path)
+        response = self.client_for(self.member).get(path, HTTP_IF_NONE_MATCH=f'W/{etag}, "other"')
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.name = "Apollo 2"
+            self.project.save()
+        etag = self.assertNotModified(1, self.member, path)
+
+        response = self.client_for(self.member).patch(path, {"status": "done"})
+        self.assertEqual(response.status_code, 200)
+        self.assertModified(self.member, path, etag)
+
+    def test_task_detail_reads_the_project_after_its_version(self):
+        def version_then_concurrent_write(project_id):
+            version = get_project_version(project_id)
+            Project.objects.filter(pk=project_id).update(name="Renamed meanwhile")
+            return version
+
+        with mock.patch("tasks.views.get_project_version", side_effect=version_then_concurrent_write):
+            response = self.client_for(self.member).get(f"/api/tasks/{self.task.pk}/")
+        # The ETag's version is never newer than the project shown with it
+        self.assertEqual(response.json()["task"]["project_details"]["name"], "Renamed meanwhile")
+
+    def test_task_comments(self):
+        # The first task has every comment, the second none
+        self.assertQueryCount(
+            1, self.member,
+            f"/api/tasks/comment/{self.task.pk}/",
+            f"/api/tasks/comment/{self.tasks[1].pk}/",
+        )
+
+
+class TieredCacheTests(SimpleTestCase):
+    def make_cache(self, **options):
+        return TieredCache(self.id(), {"OPTIONS": {
+            "REMOTE_BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCAL_KEYS": ["hot"],
+            "LOCK_WAIT": 0.1,
+            **options,
+        }})
+
+    def test_local_keys_skip_the_remote(self):
+        cache = self.make_cache()
+        cache.set("hot_version", 1)
+        cache.set("cold", 1)
+        with mock.patch.object(cache.remote, "get", wraps=cache.remote.get) as remote_get:
+            for _ in range(3):
+                self.assertEqual(cache.get("hot_version"), 1)
+                self.assertEqual(cache.get("cold"), 1)
+        self.assertEqual(remote_get.call_count, 3)
+
+        self.assertEqual(cache.incr("hot_version"), 2)
+        self.assertEqual(cache.get("hot_version"), 2)
+
+    def test_get_or_set_computes_once(self):
+        cache = self.make_cache()
+        compute = mock.Mock(return_value=[1, 2])
+        self.assertEqual(cache.get_or_set("results", compute, 60), [1, 2])
+        self.assertEqual(cache.get_or_set("results", compute, 60), [1, 2])
+        self.assertEqual(cache.get("results"), [1, 2])
+        compute.assert_called_once()
+
+    def test_get_or_set_waits_for_the_lock_holder(self):
+        cache = self.make_cache()
+        cache.add("results:lock", 1)
+        compute = mock.Mock(return_value="mine")
+        with mock.patch("taskflow.tiered_cache.time.sleep", side_effect=lambda _: cache.set("results", "theirs")):
+            self.assertEqual(cache.get_or_set("results", compute, 60), "theirs")
+        compute.assert_not_called()
+
+        # A lock holder that never delivers only delays the others
+        self.assertEqual(cache.get_or_set("other", compute, 60), "mine")
+        cache.add("stuck:lock", 1)
+        self.assertEqual(cache.get_or_set("stuck", compute, 60), "mine")
+
+    def test_expiring_values_are_recomputed_early(self):
+        cache = self.make_cache()
+        cache.set("results", Stamped("old", delta=10.0, expires_at=time.time() + 1), 60)
+        cache.set("fresh", Stamped("old", delta=0.001, expires_at=time.time() + 60), 60)
+        with mock.patch("taskflow.tiered_cache.random.random", return_value=0.5):
+            self.assertEqual(cache.get_or_set("results", lambda: "new", 60), "new")
+            self.assertEqual(cache.get_or_set("fresh", lambda: "new", 60), "old")
+
+    def test_unreachable_remote_falls_back_to_local_memory(self):
+        cache = self.make_cache(REMOTE_BACKEND="taskflow.testing.StubRedisCache")
+        cache.remote.down = True
+        with self.assertLogs("taskflow", "WARNING"):
+            cache.set("cold", 1)
+            self.assertEqual(cache.get("cold"), 1)
+            self.assertEqual(cache.get_or_set("results", lambda: [3], 60), [3])
+
+    def test_circuit_breaker_backs_off_and_recovers(self):
+        now = [0.0]
+        cache = self.make_cache(REMOTE_BACKEND="taskflow.testing.StubRedisCache", CIRCUIT_FAILURE_THRESHOLD=2)
+        cache.breaker.clock = lambda: now[0]
+        redis = cache.remote
+        redis.down = True
+
+        with self.assertLogs("taskflow", "WARNING") as logs:
+            cache.get("a")
+            cache.get("a")
+        self.assertEqual(cache.breaker.state, CircuitBreaker.OPEN)
+        self.assertIn("circuit open", logs.output[0])
+        self.assertEqual(metrics.CACHE_CIRCUIT_OPEN.snapshot()["[]"], 1)
+
+        # Open: Redis is not even tried
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(redis.calls, 2)
+
+        # One trial after the backoff; it fails and the backoff doubles
+        first_retry = cache.breaker.retry_at
+        now[0] = first_retry
+        with self.assertLogs("taskflow", "WARNING"):
+            cache.get("a")
+        self.assertEqual(redis.calls, 3)
+        self.assertGreater(cache.breaker.retry_at - now[0], first_retry * 1.3)
+
+        redis.down = False
+        now[0] = cache.breaker.retry_at
+        with self.assertLogs("taskflow", "INFO") as logs:
+            cache.set("a", 2)
+        self.assertEqual(cache.breaker.state, CircuitBreaker.CLOSED)
+        self.assertIn("circuit closed", logs.output[0])
+        self.assertEqual(metrics.CACHE_CIRCUIT_OPEN.snapshot()["[]"], 0)
+        self.assertEqual(cache.get("a"), 2)
+
+
+@override_settings(CACHES=STUB_REDIS_CACHES)
+class RedisOutageTests(QueryCountTestCase):
+    def test_tasks_work_without_redis(self):
+        default_cache.remote.down = True
+        self.addCleanup(setattr, default_cache.remote, "down", False)
+        client = self.client_for(self.member)
+
+        with self.assertLogs("taskflow", "WARNING"):
+            response = client.post("/api/tasks/", {"name": "Offline", "project": self.project.pk})
+            self.assertEqual(response.status_code, 201)
+            for _ in range(2):
+                response = client.get("/api/tasks/?search=offline")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["count"], 1)
+
+
+@override_settings(TASK_CHANGES_SETTLE_SECONDS=0)
+class TaskChangesTests(QueryCountTestCase):
+    path = "/api/tasks/changes/"
+
+    def sync(self, client, cursor=None, limit=None):
+        params = {key: value for key, value in (("since", cursor), ("limit", limit)) if value}
+        response = client.get(self.path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count(self):
+        # tasks, tombstones, the user's roles in the tasks' projects
+        self.assertQueryCount(3, self.member, f"{self.path}?limit=1", f"{self.path}?limit=50")
+
+    def test_initial_sync_pages_through_every_task(self):
+        client = self.client_for(self.member)
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = self.sync(client, cursor, limit=25)
+            seen += [task["id"] for task in page["tasks"]]
+            cursor, pages = page["cursor"], pages + 1
+            if not page["has_more"]:
+                break
+        self.assertEqual(pages, 3)
+        self.assertCountEqual(seen, [task.pk for task in self.tasks])
+
+        self.assertEqual(self.sync(client, cursor)["tasks"], [])
+
+    def test_changes_and_deletions_since_the_cursor(self):
+        client = self.client_for(self.member)
+        cursor = self.sync(client, limit=500)["cursor"]
+
+        updated, deleted = self.tasks[5], self.tasks[6]
+        self.assertEqual(client.patch(f"/api/tasks/{updated.pk}/", {"status": "done"}).status_code, 200)
+        self.assertEqual(client.delete(f"/api/tasks/{deleted.pk}/").status_code, 200)
+        created = client.post("/api/tasks/", {"name": "New", "project": self.project.pk}).json()
+
+        page = self.sync(client, cursor)
+        self.assertEqual([task["id"] for task in page["tasks"]], [updated.pk, created["task"]["id"]])
+        self.assertEqual(page["deleted"], [deleted.pk])
+
+        page = self.sync(client, page["cursor"])
+        self.assertEqual((page["tasks"], page["deleted"]), ([], []))
+
+    def test_deletions_are_scoped_like_tasks(self):
+        cursors = {user: self.sync(self.client_for(user))["cursor"] for user in (self.outsider, self.staff)}
+        self.client_for(self.superadmin).delete(f"/api/tasks/{self.task.pk}/")
+
+        self.assertEqual(self.sync(self.client_for(self.outsider), cursors[self.outsider])["deleted"], [])
+        self.assertEqual(self.sync(self.client_for(self.staff), cursors[self.staff])["deleted"], [self.task.pk])
+
+    def test_reassigned_tasks_are_deleted_for_the_previous_assignee(self):
+        cursors = {user: self.sync(self.client_for(user))["cursor"] for user in (self.member, self.staff)}
+        task = Task.objects.get(pk=self.task.pk)
+        task.user = self.outsider
+        task.save()
+
+        page = self.sync(self.client_for(self.member), cursors[self.member])
+        self.assertEqual((page["tasks"], page["deleted"]), ([], [task.pk]))
+        # Staff still see the task
+        page = self.sync(self.client_for(self.staff), cursors[self.staff])
+        self.assertEqual(([task["id"] for task in page["tasks"]], page["deleted"]), ([task.pk], []))
+
+        # Reassigned back: the task again, without its tombstone
+        task.user = self.member
+        task.save()
+        page = self.sync(self.client_for(self.member), cursors[self.member])
+        self.assertEqual(([task["id"] for task in page["tasks"]], page["deleted"]), ([task.pk], []))
+
+    def test_reassignment_tombstones_ignore_receiver_order(self):
+        # Connected last, after the task counters
+        post_save.disconnect(task_reassigned_post_save, sender=Task)
+        post_save.connect(task_reassigned_post_save, sender=Task)
+
+        task = Task.objects.get(pk=self.task.pk)
+        task.user = self.outsider
+        task.save()
+        task.user = self.staff
+        task.save()
+        self.assertEqual(
+            list(TaskTombstone.objects.values_list("user_id", flat=True)), [self.member.pk, self.outsider.pk],
+        )
+
+    def test_cursor_moves_past_read_tombstones(self):
+        # Nothing deleted since a cursor close to expiring
+        cursor = encode_cursor(None, (timezone.now() - timedelta(days=29), 0))
+        _, deleted_after = decode_cursor(self.sync(self.client_for(self.member), cursor)["cursor"])
+        self.assertGreater(deleted_after[0], timezone.now() - timedelta(minutes=1))
+
+    @override_settings(TASK_CHANGES_SETTLE_SECONDS=60)
+    def test_recent_changes_wait_to_settle(self):
+        Task.objects.filter(pk=self.task.pk).update(updated_at=timezone.now())
+        page = self.sync(self.client_for(self.member), limit=500)
+        self.assertNotIn(self.task.pk, [task["id"] for task in page["tasks"]])
+
+    def test_bad_and_expired_cursors(self):
+        client = self.client_for(self.member)
+        self.assertEqual(client.get(self.path, {"since": "garbage"}).status_code, 400)
+        self.assertEqual(client.get(self.path, {"limit": "many"}).status_code, 400)
+
+        naive = encode_cursor(None, (timezone.now().replace(tzinfo=None), 0))
+        self.assertEqual(client.get(self.path, {"since": naive}).status_code, 400)
+        naive = encode_cursor((timezone.now().replace(tzinfo=None), 0), (timezone.now(), 0))
+        self.assertEqual(client.get(self.path, {"since": naive}).status_code, 400)
+
+        expired = encode_cursor(None, (timezone.now() - timedelta(days=31), 0))
+        self.assertEqual(client.get(self.path, {"since": expired}).status_code, 410)
+        self.assertFalse(TaskTombstone.objects.exists())
@@ -1,9 +1,11 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path("", view=views.CreateListTaskView.as_view(), name="create_task"),
     path("<int:pk>/", view=views.RetriveUpdateDeleteTaskView.as_view(), name="retrive_update"),
+    path("async/", view=async_views.task_list, name="async_task_list"),
+    path("changes/", view=views.TaskChangesView.as_view(), name="task_changes"),
     path("comment/", view=views.AddCommentView.as_view(), name="add_comment"),
     path("comment/<int:pk>/", view=views.ListUpdateCommentsView.as_view(), name="list_update_comment"),
 ]
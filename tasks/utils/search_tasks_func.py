@@ -1,7 +1,10 @@
+import hashlib
+
 from django.core.cache import cache
 from django.db.models import Q, Case, When
 from rapidfuzz import fuzz
-from ..models import Task
+from analytics.metrics import CACHE_REQUESTS
+from taskflow.version_counters import bump_version, get_version
 
 CACHE_TIMEOUT = 60 * 5   # 5 minutes
 MAX_CANDIDATES = 300
@@ -11,21 +14,36 @@ TASK_SEARCH_VERSION_KEY = "task_search_version"
 
 def search_tasks(tasks, query):
     query = query.strip().lower()
-    version = cache.get_or_set("task_search_version", 1)
-    cache_key = f"task_search:{version}:{query}"
+    # Served from the process-local cache tier, see CACHES
+    version = get_task_search_version()
+    # Results depend on the caller's visible tasks and filters, not just the query
+    scope = hashlib.md5(str(tasks.query).encode()).hexdigest()
+    cache_key = f"task_search:{version}:{scope}:{query}"
+
+    computed = []
+
+    def rank():
+        computed.append(True)
+        return rank_task_ids(tasks, query)
+
+    # One process ranks a missing or soon to expire key, the others wait for it
+    ordered_ids = cache.get_or_set(cache_key, rank, CACHE_TIMEOUT)
+    CACHE_REQUESTS.inc(cache="task_search", result="miss" if computed else "hit")
 
-    # Check cache
-    cached_ids = cache.get(cache_key)
-    if cached_ids is not None:
-        return (
-            Task.objects
-            .filter(id__in=cached_ids)
-            .order_by(
-                Case(
-                    *[When(id=pk, then=pos) for pos, pk in enumerate(cached_ids)]
-                )
+    # Return QuerySet
+    return (
+        tasks
+        .filter(id__in=ordered_ids)
+        .order_by(
+            Case(
+                *[When(id=pk, then=pos) for pos, pk in enumerate(ordered_ids)]
             )
         )
+    )
+
+
+def rank_task_ids(tasks, query):
+    """Ids of the tasks fuzzily matching `query`, best match first"""
     # DB pre-filter
     qs = (
         tasks
@@ -48,27 +66,10 @@ def search_tasks(tasks, query):
 
     # Sort & extract IDs
     scored.sort(reverse=True, key=lambda x: x[0])
-    ordered_ids = [task_id for _, task_id in scored]
-
-    # Cache result
-    cache.set(cache_key, ordered_ids, CACHE_TIMEOUT)
-
-    # Return QuerySet
-    return (
-        Task.objects
-        .filter(id__in=ordered_ids)
-        .order_by(
-            Case(
-                *[When(id=pk, then=pos) for pos, pk in enumerate(ordered_ids)]
-            )
-        )
-    )
+    return [task_id for _, task_id in scored]
 
 def bump_task_search_version():
-    cache.set(
-        TASK_SEARCH_VERSION_KEY,
-        cache.get_or_set(TASK_SEARCH_VERSION_KEY, 0) + 1
-    )
+    bump_version(TASK_SEARCH_VERSION_KEY, None)
 
 def get_task_search_version():
-    return cache.get("task_search_version", 0)
\ No newline at end of file
+    return get_version(TASK_SEARCH_VERSION_KEY, None)
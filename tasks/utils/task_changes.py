@@ -0,0 +1,125 @@
+"""
+Delta sync for tasks.
+
+A client keeps a local copy of its tasks by calling /api/tasks/changes/
+with the cursor of its previous call. Each call returns the visible tasks
+created or updated after the cursor, in (updated_at, id) order, and the ids
+of tasks deleted since, from TaskTombstone. Without a cursor the task stream
+starts from the beginning, which doubles as the initial sync.
+
+A task reassigned away from a user leaves a tombstone for them too, so it
+drops out of their copy. Tombstones of tasks the user can see again, after
+being reassigned back, are skipped; clients apply the deleted ids of a
+response before its tasks. Reassignments through QuerySet.update() skip
+model signals and leave no tombstone.
+
+The cursor holds one keyset position per stream. Rows only become visible
+once they are TASK_CHANGES_SETTLE_SECONDS old: updated_at is taken before
+commit, so a slow transaction could otherwise commit a row behind a cursor
+that has already moved past it. Tombstones are kept for
+TASK_TOMBSTONE_RETENTION_DAYS; older cursors are rejected and the client has
+to sync from scratch. Once a call has read every tombstone up to the settle
+point, the cursor moves there, so a client that polls regularly never
+expires just because nothing was deleted.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from ..models import TaskTombstone
+from .task_filters import get_base_tasks_queryset
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def encode_cursor(tasks_after, deleted_after):
+    payload = {
+        "t": [tasks_after[0].isoformat(), tasks_after[1]] if tasks_after else None,
+        "d": [deleted_after[0].isoformat(), deleted_after[1]],
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(tasks_after, deleted_after) positions, tasks_after is None before the first task"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        tasks_after = payload["t"] and (datetime.fromisoformat(payload["t"][0]), int(payload["t"][1]))
+        deleted_after = (datetime.fromisoformat(payload["d"][0]), int(payload["d"][1]))
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise ValidationError({"since": "Invalid cursor."})
+    # Naive timestamps cannot be compared with the aware ones of the database
+    if any(position[0].tzinfo is None for position in (tasks_after, deleted_after) if position):
+        raise ValidationError({"since": "Invalid cursor."})
+    return tasks_after or None, deleted_after
+
+
+def _after(queryset, field, position):
+    if position is None:
+        return queryset
+    timestamp, pk = position
+    return queryset.filter(Q(**{f"{field}__gt": timestamp}) | Q(**{field: timestamp, "id__gt": pk}))
+
+
+def get_task_changes(user, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Returns the changed tasks (with user and project loaded), the deleted task
+    ids, the next cursor and whether either stream has more rows.
+    """
+    now = timezone.now()
+    until = now - timedelta(seconds=settings.TASK_CHANGES_SETTLE_SECONDS)
+
+    if cursor:
+        tasks_after, deleted_after = decode_cursor(cursor)
+        if deleted_after[0] < now - timedelta(days=settings.TASK_TOMBSTONE_RETENTION_DAYS):
+            raise CursorExpired
+    else:
+        # Whatever is deleted from here on is reported as a tombstone
+        tasks_after, deleted_after = None, (until, 0)
+
+    tasks = _after(get_base_tasks_queryset(user), "updated_at", tasks_after)
+    tasks = list(
+        tasks.filter(updated_at__lte=until)
+        .select_related("user", "project")
+        .order_by("updated_at", "id")[:limit + 1]
+    )
+
+    tombstones = TaskTombstone.objects.all()
+    if not (user.is_staff or user.is_superuser):
+        tombstones = tombstones.filter(user_id=user.pk)
+    tombstones = list(
+        _after(tombstones, "deleted_at", deleted_after)
+        .filter(deleted_at__lte=until)
+        # Reassigned tasks still or again visible to the user
+        .exclude(Exists(get_base_tasks_queryset(user).filter(pk=OuterRef("task_id"))))
+        .order_by("deleted_at", "id")
+        .values_list("deleted_at", "id", "task_id")[:limit + 1]
+    )
+
+    tombstones_read = len(tombstones) <= limit
+    has_more = len(tasks) > limit or not tombstones_read
+    tasks, tombstones = tasks[:limit], tombstones[:limit]
+    if tasks:
+        tasks_after = (tasks[-1].updated_at, tasks[-1].id)
+    if tombstones:
+        deleted_after = tombstones[-1][:2]
+    if tombstones_read and deleted_after < (until, 0):
+        # Every tombstone up to `until` was read
+        deleted_after = (until, 0)
+
+    return {
+        "tasks": tasks,
+        "deleted": [task_id for _, _, task_id in tombstones],
+        "cursor": encode_cursor(tasks_after, deleted_after),
+        "has_more": has_more,
+    }
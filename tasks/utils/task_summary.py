@@ -0,0 +1,19 @@
+from django.db.models import Count, Q
+
+SUMMARY_STATUSES = {
+    "todo_tasks": "todo",
+    "in_progress_tasks": "progress",
+    "completed_tasks": "done",
+}
+
+
+def _summary_aggregates():
+    aggregates = {"total_tasks": Count("id")}
+    for key, status in SUMMARY_STATUSES.items():
+        aggregates[key] = Count("id", filter=Q(status=status))
+    return aggregates
+
+
+def get_task_summary(tasks):
+    """Total and per-status task counts of a queryset, in a single query"""
+    return tasks.aggregate(**_summary_aggregates())
@@ -2,16 +2,23 @@ import logging
 from rest_framework.views import APIView
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.permissions import IsAuthenticated
+from taskflow.db_router import use_replica
+from taskflow.etags import make_etag, not_modified, with_etag
+from projects.permissions_constant.permission_utils import build_permissions_map, get_project_roles
 from tasks.permissions import IsOwnerOrAdmin, IsOwner, CreateTaskPermission
 from tasks.utils.pagination import TaskPagination
 from tasks.utils.search_tasks_func import bump_task_search_version
+from tasks.utils.task_changes import DEFAULT_LIMIT, MAX_LIMIT, CursorExpired, get_task_changes
 from tasks.utils.task_filters import apply_task_filters, get_base_tasks_queryset
+from projects.utils.versioning import get_project_version
+from users.utils.user_directory import get_user_directory_version
 from .serializers import CommentSerializer, TaskSerializer
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Task, TaskComment
 from django.shortcuts import get_object_or_404
 
+@use_replica
 class CreateListTaskView(APIView):
     """
     API view to create a new task and list tasks with filtering and pagination.
@@ -45,12 +52,18 @@ class CreateListTaskView(APIView):
         tasks = apply_task_filters(tasks, request.query_params)
 
         # Ordering
-        tasks = tasks.order_by("-id")
+        tasks = tasks.select_related("user", "project").order_by("-id")
 
         paginator = self.pagination_class()
         paginated_tasks = paginator.paginate_queryset(tasks, request)
 
-        serializer = TaskSerializer(paginated_tasks, many=True, context={'request': request})
+        # One membership query for the whole page instead of one per task
+        project_ids = {task.project_id for task in paginated_tasks if task.project_id}
+        project_roles = get_project_roles(request.user, project_ids)
+        serializer = TaskSerializer(paginated_tasks, many=True, context={
+            'request': request,
+            'project_permissions': build_permissions_map(request.user, project_ids, project_roles),
+        })
 
         return paginator.get_paginated_response({
             "message": "Tasks fetched successfully",
@@ -77,6 +90,46 @@ class CreateListTaskView(APIView):
             return Response({"errors":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
         
 
+class TaskChangesView(APIView):
+    """
+    Delta sync: tasks created or updated since the `since` cursor, ids of the
+    tasks deleted since, and the cursor for the next call. Without `since`
+    it starts from the first task. See tasks/utils/task_changes.py.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            return Response({"error": {"limit": "Must be an integer."}}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": {"limit": "Must be positive."}}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            changes = get_task_changes(request.user, request.query_params.get("since"), limit)
+        except CursorExpired:
+            return Response(
+                {"message": "Cursor expired, sync again without `since`"},
+                status=status.HTTP_410_GONE,
+            )
+
+        project_ids = {task.project_id for task in changes["tasks"] if task.project_id}
+        project_roles = get_project_roles(request.user, project_ids)
+        serializer = TaskSerializer(changes["tasks"], many=True, context={
+            'request': request,
+            'project_permissions': build_permissions_map(request.user, project_ids, project_roles),
+        })
+
+        return Response({
+            "message": "Task changes fetched successfully",
+            "tasks": serializer.data,
+            "deleted": changes["deleted"],
+            "cursor": changes["cursor"],
+            "has_more": changes["has_more"],
+        })
+
+
 class CreateListTaskGenericView(ListCreateAPIView):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
@@ -126,10 +179,27 @@ class RetriveUpdateDeleteTaskView(APIView):
         :param request: Description
         :param pk: Description
         """
-        task = get_object_or_404(Task, id=pk)
-        self.check_object_permissions(request, task)
+        # Versions before the data they describe: the task's project and
+        # timestamp, then the versions of the project and the assigned user
+        # shown alongside it, then the task with both loaded
+        current = get_object_or_404(
+            # The assigned user's id for the owner check
+            Task.objects.select_related("user").only("id", "project_id", "updated_at", "user__id"), id=pk,
+        )
+        self.check_object_permissions(request, current)
+
+        etag = make_etag(
+            "task", current.pk, current.updated_at.isoformat(), request.user.pk,
+            get_project_version(current.project_id) if current.project_id else None,
+            get_user_directory_version(),
+        )
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        task = get_object_or_404(Task.objects.select_related("user", "project"), id=pk)
         serializer = TaskSerializer(task, context={'request': request})
-        return Response({"task":serializer.data}, status=status.HTTP_200_OK)
+        return with_etag(Response({"task":serializer.data}, status=status.HTTP_200_OK), etag)
 
 
     def patch(self, request, pk):
@@ -220,7 +290,7 @@ class ListUpdateCommentsView(APIView):
         :param request: Description
         :param pk: Description
         """
-        comments = TaskComment.objects.filter(task__id=pk)
+        comments = TaskComment.objects.filter(task__id=pk).select_related("task__user", "task__project")
         if not (request.user.is_staff or request.user.is_superuser):
             comments = comments.filter(user=request.user)
 
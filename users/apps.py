@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # Connects every handler in users.signals. Besides the cache
+        # invalidation handlers this includes assign_role_permission, which
+        # was never connected before: users created one at a time (API,
+        # admin, createsuperuser) now get the permissions of their global
+        # role, as bulk provisioning grants them.
+        import users.signals
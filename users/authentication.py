@@ -0,0 +1,36 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.utils.user_snapshot import get_user_snapshot, user_from_snapshot
+
+
+class CachedUserJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the user from a cached snapshot instead
+    of running a User SELECT on every request.
+
+    Snapshots are invalidated from the User post_save signal; other worker
+    processes may keep a stale snapshot for up to USER_SNAPSHOT_LOCAL_TTL
+    seconds. Token revocation on password change needs the password hash, so
+    it falls back to the regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        snapshot = get_user_snapshot(user_id)
+        if snapshot is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not snapshot["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user_from_snapshot(snapshot)
@@ -1,12 +1,58 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
 from users.models import User
+from users.utils.passwords import hash_passwords, hashing_pool
+
 
 class Command(BaseCommand):
+    help = (
+        "Hash passwords stored in plain text by legacy imports. Rows are processed "
+        "in primary key order and already hashed rows are skipped, so an "
+        "interrupted run can simply be started again, or resumed with --start-after."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, help="Password hashing processes, defaults to all cores")
+        parser.add_argument("--start-after", type=int, default=0, help="Skip users with an id up to this one")
+        parser.add_argument("--dry-run", action="store_true", help="Only list the users that would be fixed")
+
+    def get_queryset(self):
+        # Hashed and unusable ("!") passwords are left alone
+        return (
+            User.objects
+            .exclude(password__startswith="pbkdf2_")
+            .exclude(password__startswith="!")
+            .order_by("pk")
+        )
+
     def handle(self, *args, **options):
-        for user in User.objects.all():
-            if not user.password.startswith("pbkdf2_"):
-                print(f"Fixing Password for {user.username}")
-                raw_password = user.password
-                user.set_password(raw_password=raw_password)
-                user.save()
\ No newline at end of file
+        queryset = self.get_queryset()
+        last_pk = options["start_after"]
+
+        if options["dry_run"]:
+            usernames = queryset.filter(pk__gt=last_pk).values_list("username", flat=True)
+            for username in usernames.iterator(chunk_size=options["chunk_size"]):
+                self.stdout.write(f"Would fix password for {username}")
+            self.stdout.write(f"{usernames.count()} passwords would be fixed")
+            return
+
+        fixed = 0
+        with hashing_pool(options["workers"]) as pool:
+            while True:
+                rows = list(queryset.filter(pk__gt=last_pk).values_list("pk", "password")[:options["chunk_size"]])
+                if not rows:
+                    break
+
+                # Empty legacy passwords become unusable rather than a hash of ""
+                hashed = hash_passwords([password or None for _, password in rows], workers=options["workers"], pool=pool)
+                users = [User(pk=pk, password=password) for (pk, _), password in zip(rows, hashed)]
+                with transaction.atomic():
+                    User.objects.bulk_update(users, ["password"])
+
+                fixed += len(users)
+                last_pk = rows[-1][0]
+                self.stdout.write(f"Fixed {fixed} passwords, last user id {last_pk}")
+
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} passwords"))
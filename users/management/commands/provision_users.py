@@ -0,0 +1,34 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.utils.provisioning import PROVISIONING_FIELDS, ProvisioningError, bulk_create_users
+
+
+class Command(BaseCommand):
+    help = "Bulk create users from a CSV or JSON file and grant their role permissions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV with a header row, or a JSON list of objects")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, help="Password hashing processes, defaults to all cores")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+
+        with path.open(newline="", encoding="utf-8") as f:
+            rows = json.load(f) if path.suffix == ".json" else list(csv.DictReader(f))
+
+        unknown = set().union(*rows) - set(PROVISIONING_FIELDS) - {"password"} if rows else set()
+        if unknown:
+            self.stdout.write(self.style.WARNING(f"Ignoring unknown columns: {', '.join(sorted(unknown))}"))
+
+        try:
+            users = bulk_create_users(rows, batch_size=options["batch_size"], workers=options["workers"])
+        except ProvisioningError as exc:
+            raise CommandError("\n".join(exc.errors))
+        self.stdout.write(self.style.SUCCESS(f"Created {len(users)} users"))
@@ -35,5 +35,8 @@ class User(AbstractUser):
     is_online = models.BooleanField(default=False)
     email_verified = models.BooleanField(default=False)
 
+    def is_superadmin(self):
+        return self.is_superuser or self.role == "superadmin"
+
     def __str__(self):
         return f"{self.first_name} ({self.last_name}) - {self.username}"
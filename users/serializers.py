@@ -43,4 +43,17 @@ class UserSerializer(ModelSerializer):
 
 class UserLoginSerializer(serializers.Serializer):
     username = serializers.CharField()
-    password = serializers.CharField(write_only=True)
\ No newline at end of file
+    password = serializers.CharField(write_only=True)
+
+class UserRecordSerializer(serializers.Serializer):
+    """Same output as UserSerializer, read from cached directory records"""
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
+    email = serializers.CharField()
+    job_role = serializers.CharField()
+    department = serializers.CharField()
+    designation = serializers.CharField()
+    date_of_joining = serializers.DateField()
+    role = serializers.CharField()
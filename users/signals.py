@@ -1,30 +1,46 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.contrib.auth.models import Permission
 from .models import User
+from .utils.provisioning import apply_role_flags, assign_role_permissions
+from .utils.user_directory import DIRECTORY_FIELDS, record_user_change
+from .utils.user_snapshot import invalidate_user_snapshot
+
+
+@receiver(pre_save, sender=User)
+def set_role_flags(sender, instance, **kwargs):
+    # Set before the INSERT so superadmins are not saved a second time
+    if instance._state.adding:
+        apply_role_flags(instance)
 
 
 @receiver(post_save, sender=User)
-def assign_role_permission(sender, instance, created, **kwargs):
-    if not created:
-        return 
-    
-    if instance.role == "superadmin":
-        # give all permissions
-        instance.is_superuser = True
-        instance.is_staff = True
-        instance.save()
-    
-    elif instance.role == "staff":
-        # Give some permissions
-        perms = Permission.objects.filter(
-            codename__in=['view_project', 'view_task', 'add_task', 'add_project']
-        )
-        instance.user_permissions.add(*perms)
-    
-    elif instance.role == "user":
-        # Basic read-only access
-        perms = Permission.objects.filter(
-            codename__in=['view_project', 'view_task']
-        )
-        instance.user_permissions.add(*perms)
+def assign_role_permission(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+
+    assign_role_permissions([instance])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def refresh_user_directory(sender, instance, created, update_fields=None, **kwargs):
+    # Skip saves that cannot change the directory, e.g. last_login updates
+    if created or update_fields is None or set(DIRECTORY_FIELDS).intersection(update_fields):
+        _record_user_change_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def remove_from_user_directory(sender, instance, **kwargs):
+    _record_user_change_on_commit(instance.pk)
+
+
+def _record_user_change_on_commit(user_id):
+    # Other processes reload the user right away, so not before the
+    # transaction commits, nor at all if it rolls back
+    transaction.on_commit(lambda: record_user_change(user_id))
@@ -1,3 +1,204 @@
-from django.test import TestCase
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from taskflow.testing import QueryCountTestCase
+from users.authentication import CachedUserJWTAuthentication
+from users.models import User
+from users.utils.user_directory import get_user_directory
+
+
+class UserQueryCountTests(QueryCountTestCase):
+    def test_user_list(self):
+        # Served from the warm user directory
+        self.assertPageQueryCount(0, self.superadmin, "/api/users/")
+        self.assertPageQueryCount(0, self.member, "/api/users/?search=m")
+
+    def test_user_autocomplete(self):
+        self.assertQueryCount(0, self.staff, "/api/users/autocomplete/?q=m")
+
+
+class UserSearchTests(QueryCountTestCase):
+    def usernames(self, response):
+        return [user["username"] for user in response.data["results"]]
+
+    def test_list_search_matches_substrings(self):
+        response = self.client_for(self.member).get("/api/users/?search=EMB")
+        self.assertEqual(self.usernames(response), ["member"])
+        self.assertEqual(response.data["count"], 1)
+
+        # Every visible match, newest first
+        response = self.client_for(self.superadmin).get("/api/users/?search=e&page_size=50")
+        self.assertEqual(self.usernames(response), ["outsider", "member", "superadmin"])
+        response = self.client_for(self.staff).get("/api/users/?search=e&page_size=50")
+        self.assertEqual(self.usernames(response), ["outsider", "member"])
+
+    def test_autocomplete_skips_hidden_users_before_the_scan_limit(self):
+        User.objects.create(username="zed", first_name="Sy")
+        # "staff" and "superadmin" sort before "sy" but are hidden from members
+        with mock.patch("users.utils.user_search.MAX_SCAN", 1):
+            response = self.client_for(self.member).get("/api/users/autocomplete/?q=s")
+        self.assertEqual(self.usernames(response), ["zed"])
+
+    def test_user_detail(self):
+        self.assertQueryCount(
+            1, self.member,
+            f"/api/users/{self.member.pk}/",
+            f"/api/users/{self.member.pk}/new/",
+        )
+
+
+class UserDirectoryTests(QueryCountTestCase):
+    def test_reloads_publish_a_new_snapshot(self):
+        directory = get_user_directory()
+        before = directory.snapshot
+        User.objects.filter(pk=self.member.pk).update(username="renamed", is_staff=True)
+        directory.reload_users([self.member.pk])
+
+        # Readers holding the old snapshot keep a consistent view
+        self.assertEqual(before.records[self.member.pk].username, "member")
+        self.assertIn(self.member.pk, before.scoped_ids["user"])
+        self.assertEqual(before.index.search("member"), [self.member.pk])
+
+        after = directory.snapshot
+        self.assertEqual(after.version, before.version)
+        self.assertEqual(after.records[self.member.pk].username, "renamed")
+        self.assertNotIn(self.member.pk, after.scoped_ids["user"])
+        self.assertEqual(after.index.search("member"), [])
+        self.assertEqual(after.index.search("renamed"), [self.member.pk])
+
+    def test_changes_are_recorded_on_commit(self):
+        with mock.patch("users.signals.record_user_change") as record:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.member.username = "renamed"
+                self.member.save()
+                pk = self.outsider.pk
+                self.outsider.delete()
+            record.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+        self.assertEqual([call.args for call in record.call_args_list], [(self.member.pk,), (pk,)])
+
+
+class CachedUserAuthenticationTests(QueryCountTestCase):
+    def authenticate(self, user):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        authenticated, _ = CachedUserJWTAuthentication().authenticate(request)
+        return authenticated
+
+    def test_snapshot_user(self):
+        for user in (self.superadmin, self.staff, self.member):
+            authenticated = self.authenticate(user)
+            with self.assertNumQueries(0):
+                authenticated = self.authenticate(user)
+                self.assertEqual(
+                    (authenticated.pk, authenticated.username, authenticated.email, authenticated.role),
+                    (user.pk, user.username, user.email, user.role),
+                )
+                self.assertEqual(authenticated.is_staff, user.is_staff)
+                self.assertEqual(authenticated.is_superuser, user.is_superuser)
+                self.assertIs(authenticated.is_active, True)
+            self.assertTrue({"password", "profile_picture", "last_login"} <= authenticated.get_deferred_fields())
+
+        self.assertFalse(self.authenticate(self.member).is_superuser)
+        self.assertFalse(self.authenticate(self.member).is_staff)
+        self.assertTrue(self.authenticate(self.superadmin).is_superuser)
+
+
+class RolePermissionSignalTests(QueryCountTestCase):
+    def test_new_users_get_their_role_permissions(self):
+        staff = User.objects.create(username="new-staff", role="staff")
+        user = User.objects.create(username="new-user", role="user")
+        superadmin = User.objects.create(username="new-superadmin", role="superadmin")
+
+        self.assertTrue(staff.has_perm("projects.add_project"))
+        self.assertTrue(user.has_perm("tasks.view_task"))
+        self.assertFalse(user.has_perm("projects.add_project"))
+        self.assertEqual(superadmin.user_permissions.count(), 0)
+        self.assertTrue(superadmin.is_superuser)
+
+
+class ProvisionUsersTests(QueryCountTestCase):
+    def provision(self, rows):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "users.json"
+            path.write_text(json.dumps(rows), encoding="utf-8")
+            call_command("provision_users", str(path), "--workers=1", "--batch-size=1", stdout=StringIO())
+
+    def assertRejected(self, rows, message):
+        before = User.objects.count()
+        with self.assertRaisesMessage(CommandError, message):
+            self.provision(rows)
+        self.assertEqual(User.objects.count(), before)
+
+    def test_creates_users_with_their_role_permissions(self):
+        self.provision([
+            {"username": "ada", "role": "staff", "password": "s3cret-pass"},
+            {"username": "bob", "job_role": "qa"},
+        ])
+        ada, bob = User.objects.get(username="ada"), User.objects.get(username="bob")
+        self.assertTrue(ada.check_password("s3cret-pass"))
+        self.assertTrue(ada.has_perm("projects.add_project"))
+        self.assertEqual((bob.role, bob.job_role, bob.has_usable_password()), ("user", "qa", False))
+
+    def test_rejects_repeated_and_taken_usernames_before_creating_any(self):
+        # With one row per batch, "ada" would be committed before the failure
+        self.assertRejected([{"username": "ada"}, {"username": "eve"}, {"username": "eve"}], "repeated in the file: eve")
+        self.assertRejected([{"username": "ada"}, {"username": "member"}], "already taken: member")
+
+    def test_rejects_unknown_roles(self):
+        self.assertRejected([{"username": "ada", "role": "admin"}], "unknown role: [1]")
+        self.assertRejected([{"username": "ada", "job_role": "wizard"}], "unknown job role: [1]")
+
+
+class FixPasswordsTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hashed = make_password("already-hashed")
+        User.objects.filter(pk=self.member.pk).update(password="plain-member")
+        User.objects.filter(pk=self.staff.pk).update(password=self.hashed)
+        # Fixture users are created with an empty password
+        User.objects.filter(pk__in=[self.superadmin.pk, self.outsider.pk]).update(password="")
+        self.legacy = User.objects.create(username="legacy")
+        User.objects.filter(pk=self.legacy.pk).update(password="plain-legacy")
+
+    def fix(self, *args):
+        stdout = StringIO()
+        call_command("fix_passwords", "--workers=1", "--chunk-size=2", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def password(self, user):
+        return User.objects.get(pk=user.pk).password
+
+    def test_hashes_plain_text_and_skips_hashed_passwords(self):
+        self.assertIn("Fixed 4 passwords", self.fix())
+
+        self.assertTrue(User.objects.get(pk=self.member.pk).check_password("plain-member"))
+        self.assertTrue(User.objects.get(pk=self.legacy.pk).check_password("plain-legacy"))
+        self.assertEqual(self.password(self.staff), self.hashed)
+        # Empty legacy passwords become unusable, not a hash of ""
+        for user in (self.superadmin, self.outsider):
+            self.assertFalse(User.objects.get(pk=user.pk).has_usable_password())
+
+        # Nothing left on a second run
+        self.assertIn("Fixed 0 passwords", self.fix())
+
+    def test_resumes_after_a_user_id(self):
+        self.fix(f"--start-after={self.outsider.pk}")
+        self.assertEqual(self.password(self.member), "plain-member")
+        self.assertTrue(User.objects.get(pk=self.legacy.pk).check_password("plain-legacy"))
+
+    def test_dry_run_lists_without_changing(self):
+        output = self.fix("--dry-run")
+        self.assertIn("Would fix password for member", output)
+        self.assertNotIn("Would fix password for staff", output)
+        self.assertIn("4 passwords would be fixed", output)
+        self.assertEqual(self.password(self.member), "plain-member")
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+import django
+from django.contrib.auth.hashers import make_password
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+@contextmanager
+def hashing_pool(workers=None):
+    """
+    Process pool for hash_passwords, to reuse across several calls.
+    Yields None when workers == 1, which makes hash_passwords run inline.
+    """
+    if workers == 1:
+        yield None
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "taskflow.settings"),),
+    ) as pool:
+        yield pool
+
+
+def hash_passwords(raw_passwords, workers=None, chunksize=8, pool=None):
+    """
+    Hash raw passwords with the configured hasher, spreading the work over a
+    process pool since PBKDF2 is CPU bound. `None` entries become unusable
+    passwords. Results keep the input order.
+
+    Pass `pool` from hashing_pool() to reuse one pool; otherwise a pool of
+    `workers` processes is started for this call.
+    """
+    raw_passwords = list(raw_passwords)
+    hashed = [make_password(None) if raw is None else None for raw in raw_passwords]
+    usable = [i for i, raw in enumerate(raw_passwords) if raw is not None]
+
+    if (pool is None and workers == 1) or len(usable) < 2:
+        for i in usable:
+            hashed[i] = make_password(raw_passwords[i])
+        return hashed
+
+    with nullcontext(pool) if pool is not None else hashing_pool(workers) as executor:
+        results = executor.map(make_password, [raw_passwords[i] for i in usable], chunksize=chunksize)
+        for i, value in zip(usable, results):
+            hashed[i] = value
+    return hashed
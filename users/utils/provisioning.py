@@ -0,0 +1,155 @@
+"""
+Role based permission assignment and bulk user provisioning.
+"""
+import threading
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import transaction
+
+from .passwords import hash_passwords
+from .user_directory import record_bulk_user_change
+
+User = get_user_model()
+
+# Superadmins get is_superuser instead of explicit permissions
+ROLE_PERMISSION_CODENAMES = {
+    "staff": ['view_project', 'view_task', 'add_task', 'add_project'],
+    "user": ['view_project', 'view_task'],
+}
+
+PROVISIONING_FIELDS = [
+    "username", "email", "first_name", "last_name", "role", "job_role",
+    "department", "designation", "phone_numer",
+]
+
+GLOBAL_ROLES = {role for role, _ in User.GLOBAL_ROLES}
+JOB_ROLES = {job_role for job_role, _ in User.JOB_ROLES}
+
+# Usernames looked up per query when checking for existing users
+USERNAME_CHECK_CHUNK = 1000
+
+_role_permission_ids = {}
+_role_permission_lock = threading.Lock()
+
+
+def get_role_permission_ids(role):
+    """Permission ids granted to a global role, resolved once per process"""
+    if role not in _role_permission_ids:
+        with _role_permission_lock:
+            if role not in _role_permission_ids:
+                _role_permission_ids[role] = list(
+                    Permission.objects
+                    .filter(codename__in=ROLE_PERMISSION_CODENAMES.get(role, []))
+                    .values_list("id", flat=True)
+                )
+    return _role_permission_ids[role]
+
+
+def clear_role_permission_cache():
+    _role_permission_ids.clear()
+
+
+def apply_role_flags(user):
+    """Set the flags implied by the global role, before the user is first saved"""
+    if user.role == "superadmin":
+        user.is_superuser = True
+        user.is_staff = True
+
+
+def assign_role_permissions(users):
+    """Grant role permissions to saved users with one insert into the M2M through table"""
+    through = User.user_permissions.through
+    rows = [
+        through(user_id=user.pk, permission_id=permission_id)
+        for user in users
+        for permission_id in get_role_permission_ids(user.role)
+    ]
+    through.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class ProvisioningError(Exception):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _row_numbers(rows, invalid):
+    return [i for i, row in enumerate(rows, start=1) if invalid(row)][:10]
+
+
+def find_provisioning_errors(rows):
+    """
+    What would make bulk_create_users fail: missing, repeated or already
+    taken usernames and unknown roles. Returns messages, empty if none.
+    """
+    errors = []
+    missing = _row_numbers(rows, lambda row: not row.get("username"))
+    if missing:
+        errors.append(f"Rows without a username: {missing}")
+
+    bad_roles = _row_numbers(rows, lambda row: row.get("role") not in GLOBAL_ROLES | {None, ""})
+    if bad_roles:
+        errors.append(f"Rows with an unknown role: {bad_roles}")
+    bad_job_roles = _row_numbers(rows, lambda row: row.get("job_role") not in JOB_ROLES | {None, ""})
+    if bad_job_roles:
+        errors.append(f"Rows with an unknown job role: {bad_job_roles}")
+
+    usernames = [row["username"] for row in rows if row.get("username")]
+    seen, repeated = set(), set()
+    for username in usernames:
+        (repeated if username in seen else seen).add(username)
+    if repeated:
+        errors.append(f"Usernames repeated in the file: {', '.join(sorted(repeated)[:10])}")
+
+    unique = sorted(seen)
+    taken = []
+    for start in range(0, len(unique), USERNAME_CHECK_CHUNK):
+        taken += User.objects.filter(username__in=unique[start:start + USERNAME_CHECK_CHUNK]).values_list(
+            "username", flat=True,
+        )
+    if taken:
+        errors.append(f"Usernames already taken: {', '.join(sorted(taken)[:10])}")
+    return errors
+
+
+def bulk_create_users(rows, batch_size=1000, workers=None):
+    """
+    Create users from dicts of PROVISIONING_FIELDS plus an optional raw
+    `password`, and grant their role permissions.
+
+    Rows are checked with find_provisioning_errors first, which raises
+    ProvisioningError. Passwords are hashed in a process pool; rows without
+    one get an unusable password. All batches are inserted in one
+    transaction, so a failure creates no users at all. bulk_create skips
+    model signals, so the user directory is told to reload instead.
+
+    Returns the created users.
+    """
+    rows = list(rows)
+    errors = find_provisioning_errors(rows)
+    if errors:
+        raise ProvisioningError(errors)
+
+    passwords = hash_passwords([row.get("password") or None for row in rows], workers=workers)
+    today = date.today()
+
+    created = []
+    with transaction.atomic():
+        for start in range(0, len(rows), batch_size):
+            users = []
+            for row, password in zip(rows[start:start + batch_size], passwords[start:start + batch_size]):
+                user = User(**{field: row[field] for field in PROVISIONING_FIELDS if row.get(field) not in (None, "")})
+                user.password = password
+                user.date_of_joining = today
+                apply_role_flags(user)
+                users.append(user)
+
+            users = User.objects.bulk_create(users)
+            assign_role_permissions(users)
+            created.extend(users)
+
+    if created:
+        record_bulk_user_change()
+    return created
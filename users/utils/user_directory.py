@@ -0,0 +1,294 @@
+"""
+Process-wide directory of compact user records for hot read paths.
+
+The directory is loaded once per process. Every User write bumps a shared
+version key and stores the changed user id under that version, so other
+processes catch up by reloading only the users that changed since their own
+version. If the change log has gaps (evicted keys, cache flush) or is too
+long, the directory is reloaded in full.
+
+Readers take no lock. Updates build a new DirectorySnapshot from copies and
+publish it with one assignment, so a reader that holds a snapshot sees its
+records, index and listings from the same state.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from analytics.metrics import CACHE_REQUESTS
+from taskflow.local_cache import LocalTTLCache
+from .user_search import UserSearchIndex, is_visible
+
+User = get_user_model()
+
+USER_DIRECTORY_VERSION_KEY = "user_directory_version"
+USER_DIRECTORY_CHANGE_KEY = "user_directory_change:{version}"
+CHANGE_LOG_TIMEOUT = 60 * 60 * 24
+MAX_INCREMENTAL_CHANGES = 500
+
+# How long a process trusts its copy of the version before asking Redis again
+VERSION_CHECK_TTL = 5
+RESULT_CACHE_TTL = 30
+
+DIRECTORY_FIELDS = [
+    "id", "username", "email", "first_name", "last_name", "role", "job_role",
+    "department", "designation", "date_of_joining", "is_staff", "is_superuser",
+]
+
+_version_cache = LocalTTLCache(maxsize=1, ttl=VERSION_CHECK_TTL)
+_result_cache = LocalTTLCache(maxsize=4096, ttl=RESULT_CACHE_TTL)
+
+
+class UserRecord:
+    __slots__ = DIRECTORY_FIELDS + ["display_name", "job_role_label", "search_text"]
+
+    def __init__(self, row):
+        for field in DIRECTORY_FIELDS:
+            setattr(self, field, row[field])
+        self.display_name = f"{self.first_name} {self.last_name}".strip() or self.username
+        self.job_role_label = self.job_role.replace("_", " ").title() if self.job_role else None
+        # The fields the user list's ?search= matches, separated so no match spans two
+        self.search_text = "\0".join(
+            value.lower() for value in (self.username, self.email, self.first_name, self.last_name) if value
+        )
+
+
+class _NewestFirst:
+    """Read-only, newest-first view over an ascending list of user ids"""
+
+    def __init__(self, records, user_ids):
+        self.records = records
+        self.user_ids = user_ids
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def count(self):
+        return len(self.user_ids)
+
+    def __getitem__(self, item):
+        size = len(self.user_ids)
+        if isinstance(item, slice):
+            start, stop, _ = item.indices(size)
+            ids = self.user_ids[size - stop:size - start][::-1] if stop > start else []
+            return [self.records[user_id] for user_id in ids]
+        return self.records[self.user_ids[size - 1 - item]]
+
+
+class DirectorySnapshot:
+    """One immutable state of the directory; changes are applied to a copy"""
+    SCOPES = ("all", "staff", "user")
+
+    def __init__(self, version, records, index, scoped_ids):
+        self.version = version
+        self.records = records
+        self.index = index
+        # Ascending ids visible to each scope, for newest-first listing
+        self.scoped_ids = scoped_ids
+
+    @classmethod
+    def load(cls, version):
+        records = {}
+        scoped_ids = {scope: [] for scope in cls.SCOPES}
+        for row in User.objects.order_by("id").values(*DIRECTORY_FIELDS).iterator(chunk_size=5000):
+            record = UserRecord(row)
+            records[record.id] = record
+            for scope in cls.SCOPES:
+                if is_visible(scope, record.is_staff, record.is_superuser):
+                    scoped_ids[scope].append(record.id)
+        return cls(version, records, UserSearchIndex(records.values()), scoped_ids)
+
+    def replace(self, user_ids, records, version):
+        """A copy with the records of `user_ids` replaced by `records`"""
+        changed = self.__class__(
+            version,
+            dict(self.records),
+            self.index.copy(),
+            {scope: list(ids) for scope, ids in self.scoped_ids.items()},
+        )
+        for user_id in user_ids:
+            changed._remove(user_id)
+        for record in records:
+            changed._add(record)
+        return changed
+
+    def _add(self, record):
+        self.records[record.id] = record
+        self.index.add(record)
+        for scope in self.SCOPES:
+            if is_visible(scope, record.is_staff, record.is_superuser):
+                insort(self.scoped_ids[scope], record.id)
+
+    def _remove(self, user_id):
+        record = self.records.pop(user_id, None)
+        if record is None:
+            return
+        self.index.remove(record)
+        for ids in self.scoped_ids.values():
+            position = bisect_left(ids, user_id)
+            if position < len(ids) and ids[position] == user_id:
+                del ids[position]
+
+    def is_visible(self, user_id, scope):
+        record = self.records.get(user_id)
+        return record is not None and is_visible(scope, record.is_staff, record.is_superuser)
+
+    def containing(self, query, scope):
+        """Ascending ids visible to `scope` with `query` in username, email, first or last name"""
+        query = query.lower()
+        records = self.records
+        return [user_id for user_id in self.scoped_ids[scope] if query in records[user_id].search_text]
+
+
+class UserDirectory:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        # Serializes writers; readers use whichever snapshot is published
+        self.lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @classmethod
+    def load(cls, version):
+        return cls(DirectorySnapshot.load(version))
+
+    def reload_users(self, user_ids, version=None):
+        """
+        Re-read the given users from the database; missing ids are dropped.
+        Publishes the result as `version`, by default the current one.
+        """
+        records = [UserRecord(row) for row in User.objects.filter(id__in=user_ids).values(*DIRECTORY_FIELDS)]
+        with self.lock:
+            snapshot = self.snapshot
+            self.snapshot = snapshot.replace(user_ids, records, snapshot.version if version is None else version)
+
+    def get_many(self, user_ids):
+        """Map user id -> record, loading users this process has not seen yet"""
+        missing = [user_id for user_id in user_ids if user_id not in self.snapshot.records]
+        if missing:
+            self.reload_users(missing)
+        records = self.snapshot.records
+        return {user_id: records[user_id] for user_id in user_ids if user_id in records}
+
+    def list_visible(self, scope):
+        """Records visible to `scope`, newest first, sliceable for pagination"""
+        snapshot = self.snapshot
+        return _NewestFirst(snapshot.records, snapshot.scoped_ids[scope])
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def _get_shared_version():
+    version = _version_cache.get(USER_DIRECTORY_VERSION_KEY)
+    if version is None:
+        version = cache.get_or_set(USER_DIRECTORY_VERSION_KEY, 1, None)
+        _version_cache.set(USER_DIRECTORY_VERSION_KEY, version)
+    return version
+
+
+def get_user_directory_version():
+    """Current version of the user directory, changes whenever a listed user field does"""
+    return _get_shared_version()
+
+
+def _catch_up(directory, version):
+    """Apply the changes logged between the directory's version and `version`"""
+    if version < directory.version or version - directory.version > MAX_INCREMENTAL_CHANGES:
+        return UserDirectory.load(version)
+
+    keys = [USER_DIRECTORY_CHANGE_KEY.format(version=v) for v in range(directory.version + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return UserDirectory.load(version)
+
+    directory.reload_users(set(changes.values()), version=version)
+    return directory
+
+
+def get_user_directory():
+    """Return this process's directory, catching up with changes made by other processes"""
+    global _directory
+    version = _get_shared_version()
+    if _directory is None or _directory.version != version:
+        with _directory_lock:
+            if _directory is None:
+                _directory = UserDirectory.load(version)
+            elif _directory.version != version:
+                _directory = _catch_up(_directory, version)
+    return _directory
+
+
+def record_user_change(user_id):
+    """Log a changed user so every process reloads it on its next directory access"""
+    cache.add(USER_DIRECTORY_VERSION_KEY, 1, None)
+    try:
+        version = cache.incr(USER_DIRECTORY_VERSION_KEY)
+    except ValueError:
+        # Key evicted between add and incr, forces a full reload everywhere
+        version = 1
+        cache.set(USER_DIRECTORY_VERSION_KEY, version, None)
+    cache.set(USER_DIRECTORY_CHANGE_KEY.format(version=version), user_id, CHANGE_LOG_TIMEOUT)
+    _version_cache.clear()
+
+
+def record_bulk_user_change():
+    """
+    Make every process reload its directory in full, for writes that skip
+    model signals such as bulk_create
+    """
+    cache.add(USER_DIRECTORY_VERSION_KEY, 1, None)
+    try:
+        cache.incr(USER_DIRECTORY_VERSION_KEY)
+    except ValueError:
+        cache.set(USER_DIRECTORY_VERSION_KEY, 1, None)
+    # No change log entry for this version, so catching up falls back to a full load
+    _version_cache.clear()
+
+
+def search_user_ids(query, scope="all", limit=10):
+    """Cached, ranked prefix search used by the autocomplete"""
+    snapshot = get_user_directory().snapshot
+    key = (snapshot.version, scope, limit, query.strip().lower())
+
+    user_ids = _result_cache.get(key)
+    CACHE_REQUESTS.inc(cache="user_search", result="hit" if user_ids is not None else "miss")
+    if user_ids is None:
+        user_ids = snapshot.index.search(
+            query,
+            limit=limit,
+            visible=lambda user_id: snapshot.is_visible(user_id, scope),
+        )
+        _result_cache.set(key, user_ids)
+    return user_ids
+
+
+def filter_users(directory, query, scope="all"):
+    """
+    Cached substring search used by the user list's ?search=, with the
+    icontains semantics it always had: every visible match in `directory`,
+    newest first, sliceable for pagination
+    """
+    snapshot = directory.snapshot
+    key = (snapshot.version, scope, None, query)
+
+    user_ids = _result_cache.get(key)
+    CACHE_REQUESTS.inc(cache="user_filter", result="hit" if user_ids is not None else "miss")
+    if user_ids is None:
+        user_ids = snapshot.containing(query, scope)
+        _result_cache.set(key, user_ids)
+    return _NewestFirst(snapshot.records, user_ids)
+
+
+def reset_user_directory():
+    """Drop this process's directory and cached results, e.g. between test cases"""
+    global _directory
+    with _directory_lock:
+        _directory = None
+    _version_cache.clear()
+    _result_cache.clear()
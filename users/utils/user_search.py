@@ -0,0 +1,94 @@
+"""
+In-memory prefix index over username, email, first and last name.
+
+All (token, user_id, rank) entries are kept in one sorted list, so a prefix
+lookup is two bisects plus a scan of the matching range, and a single user
+can be added or removed without rebuilding. The index lives inside the
+process's UserDirectory and follows its incremental refreshes.
+"""
+from bisect import bisect_left, insort
+
+# Lower rank wins
+RANK_EXACT_USERNAME = 0
+RANK_USERNAME = 1
+RANK_NAME = 2
+RANK_EMAIL = 3
+
+# Bounds the candidates ranked for one- or two-letter queries on large directories
+MAX_SCAN = 5000
+
+
+def get_visibility_scope(user):
+    """Which users `user` may list: 'all', 'staff' (no superusers) or 'user' (no staff)"""
+    if user.is_superuser:
+        return "all"
+    if user.is_staff:
+        return "staff"
+    return "user"
+
+
+def is_visible(scope, is_staff, is_superuser):
+    if scope == "all":
+        return True
+    if scope == "staff":
+        return not is_superuser
+    return not (is_staff or is_superuser)
+
+
+def _record_entries(record):
+    entries = [(record.username.lower(), record.id, RANK_USERNAME)]
+    if record.email:
+        entries.append((record.email.lower(), record.id, RANK_EMAIL))
+    for name in (record.first_name, record.last_name, f"{record.first_name} {record.last_name}".strip()):
+        if name:
+            entries.append((name.lower(), record.id, RANK_NAME))
+    return entries
+
+
+class UserSearchIndex:
+    def __init__(self, records=()):
+        self.entries = sorted(entry for record in records for entry in _record_entries(record))
+
+    def copy(self):
+        index = self.__class__()
+        index.entries = list(self.entries)
+        return index
+
+    def add(self, record):
+        for entry in _record_entries(record):
+            insort(self.entries, entry)
+
+    def remove(self, record):
+        for entry in _record_entries(record):
+            position = bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+
+    def search(self, query, limit=10, visible=None):
+        """
+        Return up to `limit` user ids with an indexed field starting with
+        `query`, best first. `visible` optionally filters user ids.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        start = bisect_left(self.entries, (query,))
+        end = bisect_left(self.entries, (query + "\uffff",))
+
+        best = {}
+        for position in range(start, end):
+            token, user_id, rank = self.entries[position]
+            # Filtered before counting, so hidden users cannot use up MAX_SCAN
+            if visible is not None and not visible(user_id):
+                continue
+            if user_id not in best and len(best) >= MAX_SCAN:
+                break
+            if rank == RANK_USERNAME and token == query:
+                rank = RANK_EXACT_USERNAME
+            # Shorter tokens are closer matches
+            score = (rank, len(token), user_id)
+            if score < best.get(user_id, (99,)):
+                best[user_id] = score
+
+        return sorted(best, key=best.__getitem__)[:limit]
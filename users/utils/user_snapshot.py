@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from analytics.metrics import CACHE_REQUESTS
+from taskflow.local_cache import LocalTTLCache
+
+User = get_user_model()
+
+USER_SNAPSHOT_KEY = "user_snapshot:{user_id}"
+
+# Everything permission checks and the user serializers read from request.user.
+# Fields outside this list (password, profile_picture, ...) stay deferred and
+# are loaded from the database only if something touches them.
+SNAPSHOT_FIELDS = [
+    "id", "username", "first_name", "last_name", "email",
+    "role", "job_role", "department", "designation", "date_of_joining",
+    "is_staff", "is_superuser", "is_active",
+]
+
+# from_db takes the loaded values in model field order
+_SNAPSHOT_ATTNAMES = [field.attname for field in User._meta.concrete_fields if field.attname in SNAPSHOT_FIELDS]
+
+_local_snapshots = LocalTTLCache(
+    maxsize=settings.USER_SNAPSHOT_LOCAL_SIZE,
+    ttl=settings.USER_SNAPSHOT_LOCAL_TTL,
+)
+
+
+def get_user_snapshot(user_id):
+    """
+    Return the cached field values of a user as a dict, or None if the user
+    does not exist. Looks in the process-local LRU first, then Redis, then
+    the database.
+    """
+    key = USER_SNAPSHOT_KEY.format(user_id=user_id)
+
+    snapshot = _local_snapshots.get(key)
+    if snapshot is not None:
+        CACHE_REQUESTS.inc(cache="user_snapshot", result="local_hit")
+        return snapshot
+
+    snapshot = cache.get(key)
+    CACHE_REQUESTS.inc(cache="user_snapshot", result="hit" if snapshot is not None else "miss")
+    if snapshot is None:
+        snapshot = User.objects.filter(id=user_id).values(*SNAPSHOT_FIELDS).first()
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, settings.USER_SNAPSHOT_CACHE_TIMEOUT)
+
+    _local_snapshots.set(key, snapshot)
+    return snapshot
+
+
+def user_from_snapshot(snapshot):
+    """Build a User instance from a snapshot without querying the database"""
+    return User.from_db("default", _SNAPSHOT_ATTNAMES, [snapshot[field] for field in _SNAPSHOT_ATTNAMES])
+
+
+def invalidate_user_snapshot(user_id):
+    key = USER_SNAPSHOT_KEY.format(user_id=user_id)
+    _local_snapshots.delete(key)
+    cache.delete(key)
+
+
+def clear_local_user_snapshots():
+    _local_snapshots.clear()
@@ -4,18 +4,22 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.views import TokenRefreshView
+from taskflow.db_router import use_replica
 from users.permissions import IsOwnerOrAdmin
 from users.utils.pagination import UserPagination, paginate_queryset
-from .serializers import UserLoginSerializer, UserSerializer
+from users.utils.user_directory import filter_users, get_user_directory, search_user_ids
+from users.utils.user_search import get_visibility_scope
+from .serializers import UserLoginSerializer, UserRecordSerializer, UserSerializer
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.generics import RetrieveUpdateAPIView, CreateAPIView
 from django.contrib.auth import get_user_model
-import time
 
 
 User = get_user_model()
 
+MAX_AUTOCOMPLETE_RESULTS = 25
+
 
 class IsOwnerOrAdminMixin:
     def check_owner_or_admin(self, request, user_obj):
@@ -25,30 +29,27 @@ class IsOwnerOrAdminMixin:
         return False
 
 
+@use_replica
 class UserListCreateViews(APIView):
     pagination_class = UserPagination
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        if request.user.is_superuser :
-            users = User.objects.all()
-        elif request.user.is_staff:
-            users = User.objects.filter(is_superuser=False)
-        else:
-            users = User.objects.filter(is_superuser=False, is_staff=False)
-        users = users.order_by('-id')
+        # Served from the process-wide user directory instead of the users table
+        directory = get_user_directory()
+        scope = get_visibility_scope(request.user)
+
         search__query = request.query_params.get('search', None)
         if search__query:
-            users = users.filter(username__icontains=search__query) | \
-                    users.filter(email__icontains=search__query) | \
-                    users.filter(first_name__icontains=search__query) | \
-                    users.filter(last_name__icontains=search__query)
-        time.sleep(1) #for simulating delay to check loading states in frontend
+            users = filter_users(directory, search__query, scope=scope)
+        else:
+            users = directory.list_visible(scope)
+
         return paginate_queryset(
             request=request,
             queryset=users,
-            serializer_class=UserSerializer,
+            serializer_class=UserRecordSerializer,
             pagination_class=self.pagination_class,
             message="All users fetched successfully"
         )
@@ -62,6 +63,38 @@ class UserListCreateViews(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
+@use_replica
+class UserAutocompleteView(APIView):
+    """
+    Ranked prefix search over username, email and first/last name for member
+    pickers. Answers from the in-process user directory without a database query.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), MAX_AUTOCOMPLETE_RESULTS)
+        except ValueError:
+            limit = 10
+
+        user_ids = search_user_ids(query, scope=get_visibility_scope(request.user), limit=limit)
+        records = get_user_directory().get_many(user_ids)
+        results = [
+            {
+                "id": record.id,
+                "username": record.username,
+                "email": record.email,
+                "first_name": record.first_name,
+                "last_name": record.last_name,
+                "display_name": record.display_name,
+                "job_role": record.job_role_label,
+            }
+            for record in records.values()
+        ]
+        return Response({"message": "Users matched", "results": results}, status=status.HTTP_200_OK)
+
+
 class UserCreateGenericView(CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer